@@ -1,57 +1,127 @@
+import heapq
+import itertools
+import threading
 import time
 
 
 class Cache:
-    def __init__(self):
+    """
+    key value cache with optional per key expiry. expiry times sit in a min-heap next to the dict:
+    a read checks only its own item, and either each call removes at most reap_batch expired keys from the top
+    of the heap, or, once start_reaper is called, a background thread does it and reads skip the work entirely.
+    heap entries of overwritten or removed keys are skipped when they surface, and the heap is rebuilt from the
+    live items once it has grown to twice their number.
+    """
+
+    def __init__(self, reap_batch: int = 10):
         self.cache_dict = {}
-        self.count = 0
-        self.has_expired_key = False
+        self.reap_batch = reap_batch
+        # (expire_at, seq, key), seq breaks expire_at ties so keys of different types are never compared
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._reaper: threading.Thread | None = None
+        self._stop_reaper = threading.Event()
 
     def set(self, key, value, ttl=None):
         """
         ttl unit: second
         """
-        if ttl is not None:
-            self.cache_dict[key] = CacheItem(key, value, expire_at=int(time.time()) + ttl)
-            self.has_expired_key = True
-        else:
-            self.cache_dict[key] = CacheItem(key, value)
+        with self._lock:
+            if ttl is not None:
+                item = CacheItem(key, value, expire_at=time.time() + ttl)
+                self.cache_dict[key] = item
+                heapq.heappush(self._heap, (item.expire_at, next(self._seq), key))
+                if len(self._heap) > 2 * len(self.cache_dict) + self.reap_batch:
+                    self.rebuild_heap()
+            else:
+                self.cache_dict[key] = CacheItem(key, value)
+            if self._reaper is None:
+                self.reap(time.time(), self.reap_batch)
 
     def get(self, key):
-        self.remove_expired()
-        if key in self.cache_dict:
-            item = self.cache_dict[key]
-            if item.expire_at is not None and item.expire_at < int(time.time()):
+        now = time.time()
+        with self._lock:
+            if self._reaper is None:
+                self.reap(now, self.reap_batch)
+            item = self.cache_dict.get(key)
+            if item is None:
+                return None
+            if item.expire_at is not None and item.expire_at <= now:
                 del self.cache_dict[key]
                 return None
             return item.value
-        return None
 
     def remove(self, key):
-        if key in self.cache_dict:
-            del self.cache_dict[key]
+        with self._lock:
+            self.cache_dict.pop(key, None)
+
+    def remove_expired(self, limit: int | None = None) -> int:
+        """
+        remove expired keys, looking at up to limit heap entries (all expired ones without a limit).
+        returns how many keys were removed
+        """
+        with self._lock:
+            return self.reap(time.time(), limit)
+
+    def reap(self, now: float, limit: int | None) -> int:
+        # caller holds _lock
+        heap = self._heap
+        removed = 0
+        popped = 0
+        while heap and heap[0][0] <= now and (limit is None or popped < limit):
+            expire_at, _, key = heapq.heappop(heap)
+            popped += 1
+            item = self.cache_dict.get(key)
+            # a key set again (or removed) since leaves a stale heap entry behind
+            if item is not None and item.expire_at == expire_at:
+                del self.cache_dict[key]
+                removed += 1
+        return removed
+
+    def rebuild_heap(self):
+        # caller holds _lock
+        self._heap = [(item.expire_at, next(self._seq), key) for key, item in self.cache_dict.items()
+                      if item.expire_at is not None]
+        heapq.heapify(self._heap)
+
+    def start_reaper(self, interval: float = 1.0):
+        """
+        expire keys from a daemon thread every interval seconds, reap_batch keys per lock acquisition
+        """
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._stop_reaper.clear()
+            self._reaper = threading.Thread(target=self.run_reaper, args=(interval,), name='seal-cache-reaper',
+                                            daemon=True)
+            self._reaper.start()
 
-    def remove_expired(self):
-        if not self.has_expired_key:
-            return
+    def stop_reaper(self):
+        with self._lock:
+            reaper, self._reaper = self._reaper, None
+        if reaper is not None:
+            self._stop_reaper.set()
+            reaper.join()
 
-        self.count += 1
-        if self.count > 1000:
-            self.count = 0
+    def run_reaper(self, interval: float):
+        while not self._stop_reaper.wait(interval):
+            # the lock is released between batches, readers wait for one batch at most
+            pending = True
+            while pending:
+                with self._lock:
+                    now = time.time()
+                    self.reap(now, self.reap_batch)
+                    pending = len(self._heap) > 0 and self._heap[0][0] <= now
 
-            will_expired_key_count = 0
-            for k in list(self.cache_dict.keys()):
-                item = self.cache_dict[k]
-                if item.expire_at is not None:
-                    will_expired_key_count += 1
-                    if item.expire_at < int(time.time()):
-                        del self.cache_dict[k]
-            if will_expired_key_count == 0:
-                self.has_expired_key = False
+    def __len__(self):
+        return len(self.cache_dict)
 
 
 class CacheItem:
-    def __init__(self, key, value, expire_at: int | None = None):
+    __slots__ = ['key', 'value', 'expire_at']
+
+    def __init__(self, key, value, expire_at: float | None = None):
         self.key = key
         self.value = value
         self.expire_at = expire_at
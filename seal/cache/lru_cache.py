@@ -1,36 +1,160 @@
+import itertools
+import sys
+import threading
+import time
 from collections import OrderedDict
-from typing import Any
+from typing import Any, Callable, Dict
 
 from ..exception import UnsupportedException
 
+# containers longer than this are sized from a sample of their first items
+_SAMPLE = 32
+
 
 class LRUCache:
-    def __init__(self, capacity: int):
-        self._cache = OrderedDict()
+    """
+    least recently used cache, safe to share between threads.
+    keys are spread over shards, each an OrderedDict with its own lock, so threads touching different keys rarely
+    wait for each other. the lru order, capacity and max_bytes are kept per shard: an approximation of a single
+    lru, exact for small caches which get one shard only.
+    ttl (seconds) is the default expiry of set, None keeps entries until they are evicted.
+    max_bytes bounds the sum of sizeof(key) + sizeof(value), estimate_size by default.
+    """
+
+    def __init__(self, capacity: int, max_bytes: int | None = None, ttl: float | None = None, shards: int = 16,
+                 sizeof: Callable[[Any], int] | None = None):
+        if capacity <= 0:
+            raise ValueError(f'capacity must be positive: {capacity}')
+        # a shard holds at least 64 entries, otherwise the per shard lru drifts too far from the global one
+        shard_count = max(1, min(shards, capacity // 64))
         self._capacity = capacity
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._sizeof = sizeof or estimate_size
+        self._shards = [_Shard(-(-capacity // shard_count), None if max_bytes is None else max_bytes // shard_count)
+                        for _ in range(shard_count)]
 
-    def get(self, key: str) -> Any:
-        if key not in self._cache:
-            return None
-        else:
-            self._cache.move_to_end(key)  # Mark as recently used
-            return self._cache[key]
+    def get(self, key: Any) -> Any:
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.misses += 1
+                return None
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                shard.pop(key)
+                shard.expirations += 1
+                shard.misses += 1
+                return None
+            shard.entries.move_to_end(key)  # Mark as recently used
+            shard.hits += 1
+            return entry[0]
 
-    def set(self, key: str, value: Any) -> None:
-        if key in self._cache:
-            self._cache.move_to_end(key)  # Mark as recently used
-        self._cache[key] = value
-        if len(self._cache) > self._capacity:
-            self._cache.popitem(last=False)  # Remove least recently used item
+    def set(self, key: Any, value: Any, ttl: float | None = None) -> None:
+        """
+        ttl unit: second, defaults to the cache's ttl
+        """
+        ttl = ttl if ttl is not None else self._ttl
+        expire_at = time.monotonic() + ttl if ttl is not None else None
+        size = self._sizeof(key) + self._sizeof(value) if self._max_bytes is not None else 0
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            if key in shard.entries:
+                shard.pop(key)
+            if shard.max_bytes is not None and size > shard.max_bytes:
+                # would evict the whole shard and still not fit
+                shard.evictions += 1
+                return
+            shard.entries[key] = (value, expire_at, size)
+            shard.bytes += size
+            while len(shard.entries) > shard.capacity or (shard.max_bytes is not None and shard.bytes > shard.max_bytes):
+                _, entry = shard.entries.popitem(last=False)  # Remove least recently used item
+                shard.bytes -= entry[2]
+                shard.evictions += 1
 
-    def remove(self, key: str) -> None:
-        if key in self._cache:
-            del self._cache[key]
+    def remove(self, key: Any) -> None:
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            if key in shard.entries:
+                shard.pop(key)
 
     def remove_prefix(self, prefix: str) -> None:
         if prefix == '':
             raise UnsupportedException('Prefix cannot be empty')
 
-        for key in list(self._cache.keys()):
-            if key.startswith(prefix):
-                del self._cache[key]
+        for shard in self._shards:
+            shard.remove_if(lambda key: isinstance(key, str) and key.startswith(prefix))
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            shard.remove_if(lambda key: True)
+
+    def __len__(self) -> int:
+        return sum([len(shard.entries) for shard in self._shards])
+
+    def stats(self) -> Dict[str, int]:
+        """
+        hits, misses, evictions (capacity or max_bytes), expirations, size (entries) and bytes (estimated)
+        """
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'size': 0, 'bytes': 0}
+        for shard in self._shards:
+            with shard.lock:
+                stats['hits'] += shard.hits
+                stats['misses'] += shard.misses
+                stats['evictions'] += shard.evictions
+                stats['expirations'] += shard.expirations
+                stats['size'] += len(shard.entries)
+                stats['bytes'] += shard.bytes
+        return stats
+
+
+class _Shard:
+    def __init__(self, capacity: int, max_bytes: int | None):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> (value, expire_at, size)
+        self.entries: OrderedDict = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def remove_if(self, predicate: Callable[[Any], bool]):
+        with self.lock:
+            for key in [key for key in self.entries.keys() if predicate(key)]:
+                self.pop(key)
+
+    def pop(self, key: Any):
+        # caller holds lock
+        self.bytes -= self.entries.pop(key)[2]
+
+
+def estimate_size(value: Any, depth: int = 4) -> int:
+    """
+    approximate memory of value in bytes: sys.getsizeof of the object and of what it holds, a few levels deep.
+    long containers are extrapolated from their first items.
+    """
+    size = sys.getsizeof(value)
+    if depth == 0 or isinstance(value, (str, bytes, bytearray, int, float, bool, type)) or value is None:
+        return size
+    if isinstance(value, dict):
+        items = [item for pair in itertools.islice(value.items(), _SAMPLE) for item in pair]
+        return size + _extrapolate(items, len(value) * 2, depth)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + _extrapolate(list(itertools.islice(value, _SAMPLE)), len(value), depth)
+    if hasattr(value, '__dict__'):
+        return size + estimate_size(vars(value), depth - 1)
+    slots = getattr(type(value), '__slots__', None)
+    if slots:
+        slots = [slots] if isinstance(slots, str) else slots
+        return size + sum([estimate_size(getattr(value, name, None), depth - 1) for name in slots])
+    return size
+
+
+def _extrapolate(items, total: int, depth: int) -> int:
+    if len(items) == 0:
+        return 0
+    sampled = sum([estimate_size(item, depth - 1) for item in items])
+    return sampled * total // len(items)
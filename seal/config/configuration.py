@@ -6,11 +6,14 @@ class Configuration:
     def __init__(self):
         self.config_dict = {}
         self._initialized = False
+        # bumped on every load, caches derived from the config compare it to know when to rebuild
+        self.version = 0
 
     def load(self, path: str):
         with open(path, 'r') as f:
             self.config_dict = yaml.load(f, Loader=yaml.FullLoader)
         self._initialized = True
+        self.version += 1
 
     def get_config(self, *keys):
         if not self._initialized:
@@ -2,8 +2,10 @@ from contextvars import ContextVar
 
 
 class WebContext:
-    def __init__(self, uid=None):
+    def __init__(self, uid=None, sql_stats=None):
         self.uid = uid
+        # SqlStats of the request, None outside of requests
+        self.sql_stats = sql_stats
 
     def set_uid(self, uid):
         self.uid = uid
@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+from .context import web_context
+
+
+class SqlStats:
+    """
+    sql activity of one request. offloaded and concurrent queries share the instance, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start_time = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.max_sql_time = 0.0
+        self.pool_wait = 0.0
+        self.materialize_time = 0.0
+        self.rows = 0
+        # sql (placeholders, so one entry per statement shape) -> executions
+        self.shapes: Dict[str, int] = {}
+
+    def record_query(self, sql: str, seconds: float, rows: int = 0):
+        with self._lock:
+            self.queries += 1
+            self.sql_time += seconds
+            self.max_sql_time = max(self.max_sql_time, seconds)
+            self.rows += rows
+            self.shapes[sql] = self.shapes.get(sql, 0) + 1
+
+    def record_rows(self, rows: int):
+        with self._lock:
+            self.rows += rows
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.pool_wait += seconds
+
+    def record_materialize(self, seconds: float):
+        with self._lock:
+            self.materialize_time += seconds
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        statements executed more than threshold times, most likely an N+1 loop
+        """
+        with self._lock:
+            return [(sql, count) for sql, count in self.shapes.items() if count > threshold]
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.start_time
+        return (f'db;dur={self.sql_time * 1000:.2f};desc="{self.queries} queries, {self.rows} rows", '
+                f'db-max;dur={self.max_sql_time * 1000:.2f}, '
+                f'pool;dur={self.pool_wait * 1000:.2f}, '
+                f'materialize;dur={self.materialize_time * 1000:.2f}, '
+                f'total;dur={total * 1000:.2f}')
+
+    def summary(self) -> str:
+        return (f'queries={self.queries} sql_ms={self.sql_time * 1000:.2f} max_sql_ms={self.max_sql_time * 1000:.2f} '
+                f'pool_wait_ms={self.pool_wait * 1000:.2f} materialize_ms={self.materialize_time * 1000:.2f} '
+                f'rows={self.rows}')
+
+
+def current_stats() -> SqlStats | None:
+    return web_context.get().sql_stats
+
+
+@contextmanager
+def profile(sql: str, args: Any = None, slow_query_log: Any = None):
+    """
+    time a statement for the current request, set .rows on the yielded holder to count the rows fetched.
+    a statement that succeeded is also handed to slow_query_log.check(sql, args, seconds, rows).
+    """
+    holder = _Profile()
+    start_time = time.perf_counter()
+    try:
+        yield holder
+    finally:
+        elapsed = time.perf_counter() - start_time
+        stats = current_stats()
+        if stats is not None:
+            stats.record_query(sql, elapsed, holder.rows)
+    if slow_query_log is not None:
+        slow_query_log.check(sql, args, elapsed, holder.rows)
+
+
+class _Profile:
+    __slots__ = ['rows']
+
+    def __init__(self):
+        self.rows = 0
+
+
+@contextmanager
+def waiting():
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            stats.record_wait(time.perf_counter() - start_time)
+
+
+@contextmanager
+def materializing():
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            stats.record_materialize(time.perf_counter() - start_time)
+
+
+def record_rows(rows: int):
+    stats = current_stats()
+    if stats is not None:
+        stats.record_rows(rows)
@@ -1,8 +1,13 @@
+from .async_insert_wrapper import AsyncInsertWrapper
+from .async_query_wrapper import AsyncQueryWrapper
+from .async_update_wrapper import AsyncUpdateWrapper
 from .insert_wrapper import InsertWrapper
+from .query_cache import QueryCache, query_cache
 from .query_wrapper import QueryWrapper
 from .structures import structures
 from .transaction import sql_context
 from .update_wrapper import UpdateWrapper
 from .wrapper import Wrapper
 
-__all__ = ['sql_context', 'Wrapper', 'QueryWrapper', 'InsertWrapper', 'UpdateWrapper', 'structures']
+__all__ = ['sql_context', 'Wrapper', 'QueryWrapper', 'InsertWrapper', 'UpdateWrapper', 'structures',
+           'AsyncQueryWrapper', 'AsyncInsertWrapper', 'AsyncUpdateWrapper', 'QueryCache', 'query_cache']
@@ -0,0 +1,62 @@
+from ..exception import UnsupportedException
+from .insert_wrapper import InsertWrapper
+from .sql_builder import build_insert, build_insert_bulk
+from .structures import structures
+
+
+class AsyncInsertWrapper(InsertWrapper):
+    """
+    InsertWrapper whose terminal methods are coroutines executed by an IAsyncExecutor.
+    """
+
+    def resolve_structure(self, database, table):
+        # loading is deferred to ensure_structure, it needs the event loop
+        self.structure_key = (database, table)
+        return structures.get(self.data_source.get_name(), database or self.data_source.get_default_database(), table)
+
+    async def ensure_structure(self):
+        if self.param_type is None:
+            self.param_type = await structures.load_async(self.data_source, *self.structure_key)
+
+    async def insert(self, data, **options):
+        if data is None:
+            raise ValueError('null data')
+
+        await self.ensure_structure()
+        if isinstance(data, dict):
+            self.handle_data_public_fields(data, True)
+        else:
+            self.handle_data_public_fields(data, False)
+        if 'duplicated_key_update' in options:
+            sql, args = build_insert(self, data, options['duplicated_key_update'])
+        else:
+            sql, args = build_insert(self, data)
+        result = await self.data_source.get_executor().insert(sql, args)
+        self.invalidate_cache()
+        return result
+
+    async def insert_bulk(self, data_list, **options):
+        if data_list is None or len(data_list) == 0:
+            raise ValueError('null data')
+
+        await self.ensure_structure()
+        if isinstance(data_list[0], dict):
+            self.handle_data_list_public_fields(data_list, True)
+        else:
+            self.handle_data_list_public_fields(data_list, False)
+
+        if 'duplicated_key_update' in options:
+            sql, args = build_insert_bulk(self, data_list, duplicated_key_update=options['duplicated_key_update'])
+        elif 'duplicated_key_ignore' in options:
+            sql, args = build_insert_bulk(self, data_list, duplicated_key_ignore=options['duplicated_key_ignore'])
+        else:
+            sql, args = build_insert_bulk(self, data_list)
+        result = await self.data_source.get_executor().insert_bulk(sql, args, options.get('batch_size'))
+        self.invalidate_cache()
+        return result
+
+    async def load(self, data, columns=None, **options):
+        """
+        LOAD DATA needs a local file the async driver cannot stream, use insert_bulk with batch_size instead
+        """
+        raise UnsupportedException(message='load is not supported for async data sources, use insert_bulk')
@@ -0,0 +1,140 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from seal.model.result import Result, Results
+from .query_cache import query_cache, table_tag
+from .query_wrapper import COUNT_STRATEGIES, QueryWrapper, _count_cache, seek_page, trim_page
+from .sql_builder import build_count
+from .structures import structures
+from ..types import Column
+
+
+class AsyncQueryWrapper(QueryWrapper):
+    """
+    QueryWrapper whose terminal methods are coroutines executed by an IAsyncExecutor.
+    """
+
+    def resolve_structure(self, database: str | None, table: str) -> Any:
+        # loading is deferred to ensure_structure, it needs the event loop
+        self.structure_key = (database, table)
+        return structures.get(self.data_source.get_name(), database or self.data_source.get_default_database(), table)
+
+    async def ensure_structure(self):
+        if self.result_type is None:
+            self.result_type = await structures.load_async(self.data_source, *self.structure_key)
+
+    async def one(self, as_dict=False, **options) -> Any:
+        await self.ensure_structure()
+        sql, args = self.build_statement(**options)
+        result: Result = await self.fetch('find', sql, args, self.result_type)
+        if as_dict:
+            return result.as_dict()
+        return result.get()
+
+    async def d_one(self, **options) -> dict:
+        return await self.one(as_dict=True, **options)
+
+    async def list(self, as_dict=False, **options) -> List[Any]:
+        await self.ensure_structure()
+        sql, args = self.build_statement(**options)
+        results: Results = await self.fetch('find_list', sql, args, self.result_type)
+        if as_dict:
+            return results.as_dict()
+        return results.get()
+
+    async def d_list(self, **options) -> List[dict]:
+        return await self.list(as_dict=True, **options)
+
+    async def page(self, page: int, page_size: int, as_dict=False, count: str = 'exact', count_ttl: int = 60,
+                   **options) -> Tuple[List[Any], int | bool | None]:
+        """
+        count strategies as QueryWrapper.page, concurrent gathers the page and COUNT(1) on two pooled connections
+        """
+        if count not in COUNT_STRATEGIES:
+            raise ValueError(f'unknown count strategy: {count}')
+
+        await self.ensure_structure()
+        executor = self.data_source.get_executor()
+        self.offset = (page - 1) * page_size
+        if count == 'none':
+            self.limit_ = page_size + 1
+            sql, args = self.build_statement(**options)
+            results: Results = await self.fetch('find_list', sql, args, self.result_type)
+            has_next = trim_page(results, page_size)
+            if as_dict:
+                return results.as_dict(), has_next
+            return results.get(), has_next
+
+        self.limit_ = page_size
+        sql, args = self.build_statement(**options)
+        count_sql, count_args = build_count(self)
+
+        if count == 'concurrent':
+            results, total = await asyncio.gather(self.fetch('find_list', sql, args, self.result_type),
+                                                  self.fetch('count', count_sql, count_args))
+        else:
+            results: Results = await self.fetch('find_list', sql, args, self.result_type)
+            if count == 'cached':
+                cache_key = f'{self.data_source.get_name()}:{count_sql}:{count_args!r}'
+                total = _count_cache.get(cache_key)
+                if total is None:
+                    total = await executor.count(count_sql, count_args)
+                    _count_cache.set(cache_key, total, ttl=count_ttl)
+            elif count == 'estimate':
+                total = await executor.estimate_count(count_sql, count_args, self.table)
+                if total is None:
+                    total = await self.fetch('count', count_sql, count_args)
+            else:
+                total = await self.fetch('count', count_sql, count_args)
+
+        if as_dict:
+            return results.as_dict(), total
+        return results.get(), total
+
+    async def d_page(self, page: int, page_size: int, **options) -> Tuple[List[dict], int | bool | None]:
+        return await self.page(page, page_size, as_dict=True, **options)
+
+    async def stream(self, batch_size: int = 1000, as_dict=False, **options) -> AsyncIterator[Any]:
+        """
+        async generator of beans (or dicts) fetched batch_size rows at a time from a server side cursor.
+        the connection is held until the generator is exhausted or closed.
+        """
+        await self.ensure_structure()
+        sql, args = self.build_statement(**options)
+        rows = self.data_source.get_executor().find_iter(sql, args, batch_size)
+        try:
+            async for row in rows:
+                yield row if as_dict else self.result_type(**row)
+        finally:
+            await rows.aclose()
+
+    def iter(self, **options) -> AsyncIterator[Any]:
+        return self.stream(**options)
+
+    async def seek(self, after: str | None = None, size: int = 20, order_by: Column = 'id', desc=False,
+                   key: Column = 'id', as_dict=False, **options) -> Tuple[List[Any], str | None]:
+        await self.ensure_structure()
+        sql, args, keys = self.build_seek(after, size, order_by, desc, key, **options)
+        results: Results = await self.fetch('find_list', sql, args, self.result_type)
+        return seek_page(results, keys, size, as_dict)
+
+    async def d_seek(self, after: str | None = None, size: int = 20, **options) -> Tuple[List[dict], str | None]:
+        return await self.seek(after, size, as_dict=True, **options)
+
+    async def columns(self, numpy: bool = False, **options) -> Dict[str, Any]:
+        await self.ensure_structure()
+        sql, args = self.build_statement(**options)
+        results: Results = await self.fetch('find_list', sql, args, self.result_type)
+        return results.to_columns(numpy)
+
+    async def count(self):
+        sql, args = build_count(self)
+        return await self.fetch('count', sql, args)
+
+    async def fetch(self, method: str, sql: str, args: Tuple[Any, ...], *extra) -> Any:
+        executor_method = getattr(self.data_source.get_executor(), method)
+        if self.cache_ttl is None:
+            return await executor_method(sql, args, *extra)
+        key = (method, sql, args if self.cache_key is None else self.cache_key)
+        return await query_cache.fetch_async(table_tag(self.data_source, self.table), key, self.cache_ttl,
+                                             lambda: executor_method(sql, args, *extra))
@@ -0,0 +1,47 @@
+from .sql_builder import build_update, build_delete
+from .structures import structures
+from .update_wrapper import UpdateWrapper
+
+
+class AsyncUpdateWrapper(UpdateWrapper):
+    """
+    UpdateWrapper whose terminal methods are coroutines executed by an IAsyncExecutor.
+    """
+
+    def resolve_structure(self, database: str | None, table: str) -> any:
+        # loading is deferred to ensure_structure, it needs the event loop
+        self.structure_key = (database, table)
+        return structures.get(self.data_source.get_name(), database or self.data_source.get_default_database(), table)
+
+    async def ensure_structure(self):
+        if self.model is None:
+            self.model = await structures.load_async(self.data_source, *self.structure_key)
+
+    async def set_all_async(self, entity: any) -> 'AsyncUpdateWrapper':
+        await self.ensure_structure()
+        return self.set_all(entity)
+
+    async def update(self, **options):
+        if len(self.condition_tree.conditions) == 0:
+            raise ValueError('unsupported update all')
+
+        self.handle_public_fields(**options)
+        sql, args = build_update(self)
+        rows = await self.data_source.get_executor().update(sql, args)
+        self.invalidate_cache()
+        return rows
+
+    async def delete(self, **options):
+        if len(self.condition_tree.conditions) == 0:
+            raise ValueError('unsupported delete all')
+
+        self.handle_public_fields(**options)
+
+        if options.get('logical_delete', False):
+            self.set(options['logical_delete'], 1)
+            return await self.update(**options)
+        else:
+            sql, args = build_delete(self)
+            rows = await self.data_source.get_executor().update(sql, args)
+            self.invalidate_cache()
+            return rows
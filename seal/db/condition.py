@@ -10,6 +10,40 @@ class Condition:
     def parse(self):
         return f'{self.field} {self.operator.value} ?', self.value
 
+    def shape(self):
+        return self.field, self.operator
+
+    def compile(self, placeholder='?'):
+        return f'{self.field} {self.operator.value} {placeholder}'
+
+    def collect_args(self, args: list):
+        args.append(self.value)
+
+
+class RowCondition:
+    """
+    row constructor comparison, e.g. (created_at, id) > (?, ?), used by seek pagination
+    """
+
+    def __init__(self, fields: tuple, values: tuple, operator: Operator = Operator.GT):
+        self.fields: tuple = tuple(fields)
+        self.values: tuple = tuple(values)
+        self.operator: Operator = operator
+
+    def parse(self):
+        return self.compile(), self.values
+
+    def shape(self):
+        return self.fields, self.operator
+
+    def compile(self, placeholder='?'):
+        if len(self.fields) == 1:
+            return f'{self.fields[0]} {self.operator.value} {placeholder}'
+        return f'({",".join(self.fields)}) {self.operator.value} ({",".join([placeholder for _ in self.fields])})'
+
+    def collect_args(self, args: list):
+        args.extend(self.values)
+
 
 class ConditionTree:
     def __init__(self, logic='and'):
@@ -32,14 +66,24 @@ class ConditionTree:
         if len(self.conditions) == 0:
             return None
         args = []
+        self.collect_args(args)
+        return self.compile(), tuple(args)
+
+    def shape(self):
+        """
+        the structure of the tree without its values, trees of the same shape compile to the same sql
+        """
+        return self.logic, tuple([condition.shape() for condition in self.conditions])
+
+    def compile(self, placeholder='?'):
         exps = []
         for condition in self.conditions:
             if isinstance(condition, ConditionTree):
-                exp, arg = condition.parse()
-                exps.append(f'({exp})')
-                args.extend(arg)
+                exps.append(f'({condition.compile(placeholder)})')
             else:
-                exp, arg = condition.parse()
-                exps.append(exp)
-                args.append(arg)
-        return f' {self.logic} '.join(exps), tuple(args)
+                exps.append(condition.compile(placeholder))
+        return f' {self.logic} '.join(exps)
+
+    def collect_args(self, args: list):
+        for condition in self.conditions:
+            condition.collect_args(args)
@@ -1,5 +1,10 @@
+import itertools
+import os
 from dataclasses import fields
+from typing import Any, Dict, List
+
 from .sql_builder import build_insert, build_insert_bulk
+from .query_cache import query_cache, table_tag
 from .structures import structures
 from seal.db.protocol import IDataSource
 
@@ -19,15 +24,7 @@ class InsertWrapper:
             self.table = f'{database}.{table}'
         self.data_source = data_source
 
-        self.param_type = structures.get(data_source=self.data_source.get_name(),
-                                         database=database or data_source.get_default_database(),
-                                         table=table)
-        if self.param_type is None:
-            self.param_type = self.data_source.load_structure(database, table)
-            structures.register(data_source=self.data_source.get_name(),
-                                database=database or data_source.get_default_database(),
-                                table=table,
-                                structure=self.param_type)
+        self.param_type = self.resolve_structure(database, table)
 
         self.tenant_field = tenant_field
         self.tenant_value = tenant_value
@@ -36,6 +33,9 @@ class InsertWrapper:
         self.logical_deleted_value_false = logical_deleted_value_false
         self.insert_fields = []
 
+    def resolve_structure(self, database, table):
+        return structures.load(self.data_source, database, table)
+
     def insert(self, data, **options):
         if data is None:
             raise ValueError('null data')
@@ -48,7 +48,9 @@ class InsertWrapper:
             sql, args = build_insert(self, data, options['duplicated_key_update'])
         else:
             sql, args = build_insert(self, data)
-        return self.data_source.get_executor().insert(sql, args)
+        result = self.data_source.get_executor().insert(sql, args)
+        self.invalidate_cache()
+        return result
 
     def insert_bulk(self, data_list, **options):
         if data_list is None or len(data_list) == 0:
@@ -65,7 +67,59 @@ class InsertWrapper:
             sql, args = build_insert_bulk(self, data_list, duplicated_key_ignore=options['duplicated_key_ignore'])
         else:
             sql, args = build_insert_bulk(self, data_list)
-        return self.data_source.get_executor().insert_bulk(sql, args)
+        result = self.data_source.get_executor().insert_bulk(sql, args, options.get('batch_size'))
+        self.invalidate_cache()
+        return result
+
+    def load(self, data, columns: List[str] | None = None, **options) -> Dict[str, Any]:
+        """
+        fast path for very large imports, returns {'rows': rows loaded, 'warnings': [...]}.
+        data is either an iterable of dicts / beans, consumed lazily, or the path of a csv file whose columns are
+        listed in `columns` (tenant and logical deleted fields are filled in by the database in that case).
+        mysql streams the rows through LOAD DATA LOCAL INFILE (local_infile must be enabled on the data source),
+        sqlite falls back to executemany in one transaction.
+        """
+        if data is None:
+            raise ValueError('null data')
+
+        constants = {}
+        if self.logical_deleted_field is not None:
+            constants[self.logical_deleted_field] = self.logical_deleted_value_false
+        if self.tenant_field is not None:
+            if self.tenant_value is None:
+                raise ValueError('tenant value not set')
+            constants[self.tenant_field] = self.tenant_value
+
+        if isinstance(data, (str, os.PathLike)):
+            if columns is None:
+                columns = [f.name for f in fields(self.param_type) if f.name != 'id' and f.name not in constants]
+            result = self.data_source.get_executor().load(self.table, columns, file_path=os.fspath(data),
+                                                          constants=constants, **options)
+            self.invalidate_cache()
+            return result
+
+        data_iterator = iter(data)
+        first = next(data_iterator, None)
+        if first is None:
+            raise ValueError('null data')
+        is_dict = isinstance(first, dict)
+        self.handle_data_public_fields(first, is_dict)
+        insert_fields = columns or self.insert_fields
+
+        def rows():
+            for item in itertools.chain([first], data_iterator):
+                self.set_public_fields(item, is_dict)
+                if is_dict:
+                    yield tuple([item.get(field) for field in insert_fields])
+                else:
+                    yield tuple([getattr(item, field) for field in insert_fields])
+
+        result = self.data_source.get_executor().load(self.table, insert_fields, rows=rows(), **options)
+        self.invalidate_cache()
+        return result
+
+    def invalidate_cache(self):
+        query_cache.invalidate(table_tag(self.data_source, self.table))
 
     # def insert_iterator(self, data_list, **options):
     #     if data_list is None or len(data_list) == 0:
@@ -80,55 +134,32 @@ class InsertWrapper:
     #     return self.data_source.get_executor().insert_interator(data_iterator)
 
     def handle_data_public_fields(self, data, is_dict):
-        if is_dict:
-            if self.logical_deleted_field is not None:
-                if self.logical_deleted_value_true is None or self.logical_deleted_value_false is None:
-                    raise ValueError('logic delete field and value is required')
-                data[self.logical_deleted_field] = self.logical_deleted_value_false
-            if self.tenant_field is not None:
-                if self.tenant_value is None:
-                    raise ValueError('tenant value not set')
-                data[self.tenant_field] = self.tenant_value
+        self.set_public_fields(data, is_dict)
+        self.insert_fields = self.resolve_insert_fields(data, is_dict)
 
-            keys = data.keys()
-            self.insert_fields = [f.name for f in fields(self.param_type) if
-                                  f.name != 'id' and f.name in keys]
-        else:
-            if self.logical_deleted_field is not None:
-                if self.logical_deleted_value_true is None or self.logical_deleted_value_false is None:
-                    raise ValueError('logic delete field and value is required')
+    def handle_data_list_public_fields(self, data_list, is_dict):
+        for data in data_list:
+            self.set_public_fields(data, is_dict)
+        self.insert_fields = self.resolve_insert_fields(data_list[0], is_dict)
+
+    def set_public_fields(self, data, is_dict):
+        if self.logical_deleted_field is not None:
+            if self.logical_deleted_value_true is None or self.logical_deleted_value_false is None:
+                raise ValueError('logic delete field and value is required')
+            if is_dict:
+                data[self.logical_deleted_field] = self.logical_deleted_value_false
+            else:
                 setattr(data, self.logical_deleted_field, self.logical_deleted_value_false)
-            if self.tenant_field is not None:
-                if self.tenant_value is None:
-                    raise ValueError('tenant value not set')
+        if self.tenant_field is not None:
+            if self.tenant_value is None:
+                raise ValueError('tenant value not set')
+            if is_dict:
+                data[self.tenant_field] = self.tenant_value
+            else:
                 setattr(data, self.tenant_field, self.tenant_value)
 
-            self.insert_fields = [f.name for f in fields(self.param_type) if
-                                  f.name != 'id' and getattr(data, f.name) is not None]
-
-    def handle_data_list_public_fields(self, data_list, is_dict):
+    def resolve_insert_fields(self, data, is_dict):
         if is_dict:
-            if self.logical_deleted_field is not None:
-                if self.logical_deleted_value_true is None or self.logical_deleted_value_false is None:
-                    raise ValueError('logic delete field and value is required')
-                map(lambda x: x.update({self.logical_deleted_field: self.logical_deleted_value_false}), data_list)
-            if self.tenant_field is not None:
-                if self.tenant_value is None:
-                    raise ValueError('tenant value not set')
-                map(lambda x: x.update({self.tenant_field: self.tenant_value}), data_list)
-
-            keys = data_list[0].keys()
-            self.insert_fields = [f.name for f in fields(self.param_type) if
-                                  f.name != 'id' and f.name in keys]
-        else:
-            if self.logical_deleted_field is not None:
-                if self.logical_deleted_value_true is None or self.logical_deleted_value_false is None:
-                    raise ValueError('logic delete field and value is required')
-                map(lambda x: setattr(x, self.logical_deleted_field, self.logical_deleted_value_false), data_list)
-            if self.tenant_field is not None:
-                if self.tenant_value is None:
-                    raise ValueError('tenant value not set')
-                map(lambda x: setattr(x, self.tenant_field, self.tenant_value), data_list)
-
-            self.insert_fields = [f.name for f in fields(self.param_type) if
-                                  f.name != 'id' and getattr(data_list[0], f.name) is not None]
+            keys = data.keys()
+            return [f.name for f in fields(self.param_type) if f.name != 'id' and f.name in keys]
+        return [f.name for f in fields(self.param_type) if f.name != 'id' and getattr(data, f.name) is not None]
@@ -0,0 +1,242 @@
+from typing import Tuple, Any, List, AsyncIterator, Dict
+
+from seal.context.sql_stats import profile, record_rows, waiting
+from seal.db.protocol import IAsyncDataSource
+from seal.db.slow_query import SlowQueryLog
+from seal.db.trace import tracer
+from seal.model.result import Result, Results
+from .executor import pyformat, columns, estimate_statement
+
+
+class AsyncMysqlExecutor:
+    """
+    connections are borrowed in autocommit mode, so every statement commits on its own.
+    sql_context transactions are not shared with the async executor.
+    slow queries are logged without a plan, there is no blocking side connection to explain them on.
+    """
+
+    def __init__(self, data_source: IAsyncDataSource, batch_size: int = 1000, max_allowed_packet: int = 1024000,
+                 slow_query_log: SlowQueryLog | None = None):
+        self.data_source = data_source
+        self.batch_size = batch_size
+        self.max_allowed_packet = max_allowed_packet
+        self.slow_query_log = slow_query_log
+
+    async def find(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Result:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor()
+        try:
+            sql = pyformat(sql)
+            result = await self.execute(cursor, sql, args)
+            if result is None:
+                return Result.empty()
+
+            row = await cursor.fetchone()
+            if row is None:
+                return Result.empty()
+
+            return Result(row=row, bean_type=bean_type)
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def find_list(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Results:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        import aiomysql
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        # plain tuples, the beans are built positionally
+        cursor = await connection.cursor(aiomysql.Cursor)
+        try:
+            sql = pyformat(sql)
+            result = await self.execute(cursor, sql, args)
+            if result is None:
+                return Results.empty()
+
+            rows = await cursor.fetchall()
+            if rows is None:
+                return Results.empty()
+
+            return Results(rows=list(rows), bean_type=bean_type, columns=columns(cursor))
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def find_iter(self, sql: str, args: Tuple[Any, ...], batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        rows are read from an unbuffered server side cursor, the connection stays pinned until the generator is
+        exhausted or closed (aclose). closing early still drains the rest of the result from the socket.
+        """
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        import aiomysql
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor(aiomysql.SSDictCursor)
+        try:
+            sql = pyformat(sql)
+            with profile(sql, args, self.slow_query_log):
+                await cursor.execute(sql, args)
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                record_rows(len(rows))
+                for row in rows:
+                    yield row
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def count(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor()
+        try:
+            sql = pyformat(sql)
+            result = await self.execute(cursor, sql, args)
+            if result is None:
+                return None
+
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+
+            return row['COUNT(1)']
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def estimate_count(self, sql: str, args: Tuple[Any, ...], table: str) -> int | None:
+        """
+        the optimizer's row estimate for a COUNT(1) statement, None when there is no estimate
+        """
+        estimate_sql, estimate_args, column = estimate_statement(sql, args, table)
+        if tracer.enabled:
+            tracer.statement(estimate_sql, estimate_args)
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor()
+        try:
+            estimate_sql = pyformat(estimate_sql)
+            result = await self.execute(cursor, estimate_sql, estimate_args)
+            if result is None:
+                return None
+
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+
+            return row.get(column)
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor()
+        try:
+            sql = pyformat(sql)
+            return await self.execute(cursor, sql, args)
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def insert(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor()
+        try:
+            sql = pyformat(sql)
+            result = await self.execute(cursor, sql, args)
+            if result is None:
+                return None
+            return cursor.lastrowid
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]], batch_size: int | None = None) -> int | None:
+        """
+        rows are sent as multi-row INSERT ... VALUES (...),(...) statements, batch_size rows at most per statement
+        and never longer than max_allowed_packet bytes
+        """
+        traced = tracer.enabled and tracer.statement(sql, args)
+        batch_size = batch_size or self.batch_size
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor()
+        cursor.max_stmt_length = self.max_allowed_packet
+        try:
+            sql = pyformat(sql)
+            await connection.begin()
+            row_affected = 0
+            with profile(sql, args, self.slow_query_log):
+                for start in range(0, len(args), batch_size):
+                    # executemany rewrites an INSERT into a single multi-row statement
+                    row_affected += await cursor.executemany(sql, args[start:start + batch_size]) or 0
+            if traced:
+                tracer.event('#### row_affected: {}', row_affected)
+            await connection.commit()
+            return row_affected
+        except Exception as e:
+            await connection.rollback()
+            raise e
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def custom_query(self, sql: str, args: Tuple[Any, ...]) -> Results:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        with waiting():
+            connection = await self.data_source.get_connection()
+        cursor = await connection.cursor()
+        try:
+            sql = pyformat(sql)
+            result = await self.execute(cursor, sql, args)
+            if result is None:
+                return Results.empty()
+
+            rows = await cursor.fetchall()
+            if rows is None:
+                return Results.empty()
+
+            return Results(rows=list(rows))
+        finally:
+            await cursor.close()
+            await self.data_source.release_connection(connection)
+
+    async def custom_update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        return await self.update(sql, args)
+
+    # noinspection PyMethodMayBeStatic
+    async def execute(self, cursor, sql: str, args) -> int:
+        # buffered cursors read the whole result set in execute, the time and rowcount cover the fetch
+        with profile(sql, args, self.slow_query_log) as p:
+            result = await cursor.execute(sql, args)
+            if cursor.description is not None:
+                p.rows = cursor.rowcount
+        return result
@@ -0,0 +1,59 @@
+import asyncio
+
+from seal.exception import PoolExhaustedException
+
+
+class AsyncConnectionPool:
+    def __init__(self, conf):
+        self.conf = conf
+
+        pool_conf = conf.get('async_pool') or conf['pool']
+        self._min_connections = pool_conf['min_connections']
+        self._max_connections = pool_conf['max_connections']
+        self._max_lifetime = pool_conf.get('max_lifetime', 1800)
+
+        # the driver pool is bound to the running event loop, so it is created on first use
+        self._pool = None
+        self._lock = asyncio.Lock()
+
+    async def get_pool(self):
+        if self._pool is not None:
+            return self._pool
+
+        async with self._lock:
+            if self._pool is None:
+                try:
+                    import aiomysql
+                except ImportError:
+                    raise ImportError('aiomysql is required by async mysql data source: pip install aiomysql')
+
+                self._pool = await aiomysql.create_pool(minsize=self._min_connections,
+                                                        maxsize=self._max_connections,
+                                                        pool_recycle=self._max_lifetime or -1,
+                                                        host=self.conf['host'],
+                                                        port=self.conf['port'],
+                                                        user=self.conf['user'],
+                                                        password=self.conf['password'],
+                                                        db=self.conf['database'],
+                                                        autocommit=True,
+                                                        cursorclass=aiomysql.DictCursor)
+        return self._pool
+
+    async def get_connection(self, timeout=3):
+        """
+        timeout unit: second, None means wait forever
+        """
+        pool = await self.get_pool()
+        try:
+            return await asyncio.wait_for(pool.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolExhaustedException()
+
+    async def release(self, connection):
+        await self._pool.release(connection)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
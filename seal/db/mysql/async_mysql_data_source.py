@@ -0,0 +1,62 @@
+from typing import Dict, Any
+
+from seal.db.protocol import IAsyncExecutor
+from seal.db.slow_query import slow_query_log
+from .async_executor import AsyncMysqlExecutor
+from .async_mysql_connection import AsyncConnectionPool
+from .table_info import TableField, TableInfo
+
+
+class AsyncMysqlDataSource:
+    def __init__(self, name: str, conf: Dict[str, Any]):
+        self.name = name
+        self.default_database = conf.get('database')
+        self.connection_pool = AsyncConnectionPool(conf)
+        self.executor: IAsyncExecutor = AsyncMysqlExecutor(self,
+                                                           batch_size=conf.get('insert_batch_size', 1000),
+                                                           max_allowed_packet=conf.get('max_allowed_packet', 1024000),
+                                                           slow_query_log=slow_query_log(self, conf))
+
+    def get_name(self) -> str:
+        return self.name
+
+    # noinspection PyMethodMayBeStatic
+    def get_type(self) -> str:
+        return 'mysql'
+
+    async def get_connection(self):
+        return await self.connection_pool.get_connection()
+
+    async def release_connection(self, connection):
+        await self.connection_pool.release(connection)
+
+    def get_executor(self) -> IAsyncExecutor:
+        return self.executor
+
+    def get_default_database(self) -> str:
+        return self.default_database
+
+    async def load_structure(self, database: str, table: str) -> Any:
+        conn = await self.get_connection()
+        c = await conn.cursor()
+        try:
+            await c.execute(f'show columns from {database}.{table}')
+            rows = await c.fetchall()
+            table_fields = []
+            for row in rows:
+                table_field = TableField(field_=row['Field'],
+                                         type_=row['Type'],
+                                         null_=row['Null'],
+                                         key_=row['Key'],
+                                         default_=row['Default'],
+                                         extra=row['Extra'])
+                table_fields.append(table_field)
+
+            table_info = TableInfo(table=table, table_fields=table_fields)
+            return table_info.parse_model()
+        finally:
+            await c.close()
+            await self.release_connection(conn)
+
+    async def close(self):
+        await self.connection_pool.close()
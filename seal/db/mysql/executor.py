@@ -1,26 +1,37 @@
-from typing import Tuple, Any, List
+import os
+import tempfile
+from functools import lru_cache
+from typing import Tuple, Any, List, Iterator, Dict, Iterable
 
-from loguru import logger
+from pymysql.cursors import Cursor, SSDictCursor
 
 from seal.db.protocol import IDatabaseConnection
 from seal.db.protocol.data_source_protocol import IDataSource
+from seal.context.sql_stats import profile, record_rows, waiting
+from seal.db.slow_query import SlowQueryLog
+from seal.db.trace import tracer
 from seal.db.transaction import sql_context
 from seal.model.result import Result, Results
 
 
 class MysqlExecutor:
 
-    def __init__(self, data_source: IDataSource):
+    def __init__(self, data_source: IDataSource, batch_size: int = 1000, max_allowed_packet: int = 1024000,
+                 slow_query_log: SlowQueryLog | None = None):
         self.data_source = data_source
+        self.batch_size = batch_size
+        self.max_allowed_packet = max_allowed_packet
+        self.slow_query_log = slow_query_log
 
     def find(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Result:
-        self.debug(sql, args)
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection: IDatabaseConnection = self.get_connection()
+        connection: IDatabaseConnection = self.get_connection(read_only=True)
         cursor = connection.cursor()
         try:
-            sql = sql.replace('?', '%s')
-            result = cursor.execute(sql, args)
+            sql = pyformat(sql)
+            result = self.execute(cursor, sql, args)
             if result is None:
                 return Result.empty()
 
@@ -36,13 +47,15 @@ class MysqlExecutor:
             self.close_connection(connection)
 
     def find_list(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Results:
-        self.debug(sql, args)
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection: IDatabaseConnection = self.get_connection()
-        cursor = connection.cursor()
+        connection: IDatabaseConnection = self.get_connection(read_only=True)
+        # plain tuples, the beans are built positionally
+        cursor = connection.cursor(Cursor)
         try:
-            sql = sql.replace('?', '%s')
-            result = cursor.execute(sql, args)
+            sql = pyformat(sql)
+            result = self.execute(cursor, sql, args)
             if result is None:
                 return Results.empty()
 
@@ -50,21 +63,46 @@ class MysqlExecutor:
             if rows is None:
                 return Results.empty()
 
-            return Results(rows=rows, bean_type=bean_type)
+            return Results(rows=list(rows), bean_type=bean_type, columns=columns(cursor))
         except Exception as e:
             raise e
         finally:
             cursor.close()
             self.close_connection(connection)
 
+    def find_iter(self, sql: str, args: Tuple[Any, ...], batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        rows are read from an unbuffered server side cursor, the connection stays pinned until the generator is
+        exhausted or closed. closing early still drains the rest of the result from the socket.
+        """
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        connection: IDatabaseConnection = self.get_connection(read_only=True)
+        cursor = connection.cursor(SSDictCursor)
+        try:
+            sql = pyformat(sql)
+            with profile(sql, args, self.slow_query_log):
+                cursor.execute(sql, args)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                record_rows(len(rows))
+                yield from rows
+        finally:
+            cursor.close()
+            self.close_connection(connection)
+
     def count(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        self.debug(sql, args)
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection: IDatabaseConnection = self.get_connection()
+        connection: IDatabaseConnection = self.get_connection(read_only=True)
         cursor = connection.cursor()
         try:
-            sql = sql.replace('?', '%s')
-            result = cursor.execute(sql, args)
+            sql = pyformat(sql)
+            result = self.execute(cursor, sql, args)
             if result is None:
                 return None
 
@@ -79,14 +117,43 @@ class MysqlExecutor:
             cursor.close()
             self.close_connection(connection)
 
+    def estimate_count(self, sql: str, args: Tuple[Any, ...], table: str) -> int | None:
+        """
+        the optimizer's row estimate for a COUNT(1) statement: information_schema.TABLES for an unfiltered table,
+        EXPLAIN otherwise. None when there is no estimate.
+        """
+        estimate_sql, estimate_args, column = estimate_statement(sql, args, table)
+        if tracer.enabled:
+            tracer.statement(estimate_sql, estimate_args)
+
+        connection: IDatabaseConnection = self.get_connection(read_only=True)
+        cursor = connection.cursor()
+        try:
+            estimate_sql = pyformat(estimate_sql)
+            result = self.execute(cursor, estimate_sql, estimate_args)
+            if result is None:
+                return None
+
+            row = cursor.fetchone()
+            if row is None:
+                return None
+
+            return row.get(column)
+        except Exception as e:
+            raise e
+        finally:
+            cursor.close()
+            self.close_connection(connection)
+
     def update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        self.debug(sql, args)
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
         connection: IDatabaseConnection = self.get_connection()
         cursor = connection.cursor()
         try:
-            sql = sql.replace('?', '%s')
-            result = cursor.execute(sql, args)
+            sql = pyformat(sql)
+            result = self.execute(cursor, sql, args)
             if result is None:
                 return None
             return result
@@ -97,13 +164,14 @@ class MysqlExecutor:
             self.close_connection(connection)
 
     def insert(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        self.debug(sql, args)
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
         connection: IDatabaseConnection = self.get_connection()
         cursor = connection.cursor()
         try:
-            sql = sql.replace('?', '%s')
-            result = cursor.execute(sql, args)
+            sql = pyformat(sql)
+            result = self.execute(cursor, sql, args)
             if result is None:
                 return None
             return cursor.lastrowid
@@ -113,18 +181,26 @@ class MysqlExecutor:
             cursor.close()
             self.close_connection(connection)
 
-    def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]]) -> int | None:
-        logger.debug(f'#### sql: {sql}')
+    def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]], batch_size: int | None = None) -> int | None:
+        """
+        rows are sent as multi-row INSERT ... VALUES (...),(...) statements, batch_size rows at most per statement
+        and never longer than max_allowed_packet bytes
+        """
+        traced = tracer.enabled and tracer.statement(sql, args)
+        batch_size = batch_size or self.batch_size
 
         connection: IDatabaseConnection = self.get_connection()
         cursor = connection.cursor()
+        cursor.max_stmt_length = self.max_allowed_packet
         try:
-            sql = sql.replace('?', '%s')
+            sql = pyformat(sql)
             row_affected = 0
-            for row_args in args:
-                logger.debug(f'#### args: {row_args}')
-                row_affected += cursor.execute(sql, row_args) or 0
-            logger.debug(f'#### row_affected: {row_affected}')
+            with profile(sql, args, self.slow_query_log):
+                for start in range(0, len(args), batch_size):
+                    # executemany rewrites an INSERT into a single multi-row statement
+                    row_affected += cursor.executemany(sql, args[start:start + batch_size]) or 0
+            if traced:
+                tracer.event('#### row_affected: {}', row_affected)
             connection.commit()
             return row_affected
         except Exception as e:
@@ -134,14 +210,63 @@ class MysqlExecutor:
             cursor.close()
             self.close_connection(connection)
 
-    def custom_query(self, sql: str, args: Tuple[Any, ...]) -> Results:
-        self.debug(sql, args)
+    def load(self, table: str, columns: List[str], rows: Iterable[Tuple[Any, ...]] | None = None,
+             file_path: str | None = None, constants: Dict[str, Any] | None = None,
+             fields_terminated_by=',', enclosed_by='"', escaped_by='', lines_terminated_by='\n',
+             ignore_lines=0) -> Dict[str, Any]:
+        """
+        LOAD DATA LOCAL INFILE from file_path, or from rows streamed into a temporary csv file first.
+        constants are assigned to every row by the SET clause.
+        """
+        if rows is not None:
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', newline='', delete=False) as f:
+                try:
+                    for row in rows:
+                        f.write(','.join([load_data_value(value) for value in row]))
+                        f.write('\n')
+                except Exception as e:
+                    f.close()
+                    os.remove(f.name)
+                    raise e
+            try:
+                return self.load(table, columns, file_path=f.name, constants=constants)
+            finally:
+                os.remove(f.name)
+
+        constants = constants or {}
+        sql = (f'LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4'
+               f' FIELDS TERMINATED BY %s ENCLOSED BY %s ESCAPED BY %s LINES TERMINATED BY %s'
+               f' IGNORE {int(ignore_lines)} LINES ({",".join(columns)})')
+        args = (file_path, fields_terminated_by, enclosed_by, escaped_by, lines_terminated_by)
+        if len(constants) > 0:
+            sql += f' SET {",".join([f"{field}=%s" for field in constants.keys()])}'
+            args += tuple(constants.values())
+        traced = tracer.enabled and tracer.statement(sql, args)
 
         connection: IDatabaseConnection = self.get_connection()
         cursor = connection.cursor()
         try:
-            sql = sql.replace('?', '%s')
-            result = cursor.execute(sql, args)
+            row_loaded = self.execute(cursor, sql, args) or 0
+            cursor.execute('SHOW WARNINGS')
+            warnings = list(cursor.fetchall())
+            if traced:
+                tracer.event('#### row_loaded: {}, warnings: {}', row_loaded, len(warnings))
+            return {'rows': row_loaded, 'warnings': warnings}
+        except Exception as e:
+            raise e
+        finally:
+            cursor.close()
+            self.close_connection(connection)
+
+    def custom_query(self, sql: str, args: Tuple[Any, ...]) -> Results:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+
+        connection: IDatabaseConnection = self.get_connection(read_only=True)
+        cursor = connection.cursor()
+        try:
+            sql = pyformat(sql)
+            result = self.execute(cursor, sql, args)
             if result is None:
                 return Results.empty()
 
@@ -157,13 +282,14 @@ class MysqlExecutor:
             self.close_connection(connection)
 
     def custom_update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        self.debug(sql, args)
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
         connection: IDatabaseConnection = self.get_connection()
         cursor = connection.cursor()
         try:
-            sql = sql.replace('?', '%s')
-            result = cursor.execute(sql, args)
+            sql = pyformat(sql)
+            result = self.execute(cursor, sql, args)
             if result is None:
                 return None
             return result
@@ -173,15 +299,28 @@ class MysqlExecutor:
             cursor.close()
             self.close_connection(connection)
 
-    def get_connection(self) -> IDatabaseConnection:
+    def get_connection(self, read_only: bool = False) -> IDatabaseConnection:
+        # inside a transaction everything goes to the transaction's (primary) connection
         ctx = sql_context.get()
-        connection: IDatabaseConnection = ctx.tx() or self.data_source.get_connection()
+        connection: IDatabaseConnection | None = ctx.tx()
+        if connection is None:
+            with waiting():
+                connection = self.data_source.get_connection(read_only)
 
         if ctx.tx() is None:
             connection.begin()
 
         return connection
 
+    # noinspection PyMethodMayBeStatic
+    def execute(self, cursor, sql: str, args) -> int:
+        # buffered cursors read the whole result set in execute, the time and rowcount cover the fetch
+        with profile(sql, args, self.slow_query_log) as p:
+            result = cursor.execute(sql, args)
+            if cursor.description is not None:
+                p.rows = cursor.rowcount
+        return result
+
     # noinspection PyMethodMayBeStatic
     def close_connection(self, connection: IDatabaseConnection):
         ctx = sql_context.get()
@@ -189,10 +328,37 @@ class MysqlExecutor:
             connection.commit()
             connection.close()
 
-    # noinspection PyMethodMayBeStatic
-    def debug(self, sql, args):
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
-        # ctx = sql_context.get()
-        # if ctx.tx() is not None:
-        #     logger.debug(f'#### Transaction id: {ctx.tx_id()}')
+
+def estimate_statement(sql: str, args: Tuple[Any, ...], table: str) -> Tuple[str, Tuple[Any, ...], str]:
+    """
+    the statement giving the row estimate of a COUNT(1) statement, with its args and the column holding the estimate
+    """
+    if len(args) == 0 and ' WHERE ' not in sql:
+        schema, _, name = table.rpartition('.')
+        return ('SELECT TABLE_ROWS FROM information_schema.TABLES'
+                ' WHERE TABLE_SCHEMA = COALESCE(NULLIF(%s, \'\'), DATABASE()) AND TABLE_NAME = %s',
+                (schema, name), 'TABLE_ROWS')
+    return f'EXPLAIN {sql}', args, 'rows'
+
+
+def columns(cursor) -> Tuple[str, ...]:
+    return tuple([description[0] for description in cursor.description])
+
+
+@lru_cache(maxsize=4096)
+def pyformat(sql: str) -> str:
+    # wrapper statements are compiled with %s already, custom sql still uses ?
+    return sql.replace('?', '%s')
+
+
+def load_data_value(value: Any) -> str:
+    # matches FIELDS ENCLOSED BY '"' ESCAPED BY '': an unquoted NULL is NULL, quotes are doubled inside values
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    return '"' + str(value).replace('"', '""') + '"'
@@ -1,4 +1,7 @@
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import pymysql
 from loguru import logger
@@ -6,20 +9,22 @@ from pymysql.connections import Connection as PyMySQLConnection
 from pymysql.cursors import DictCursor
 
 from seal.enum.connection_status import ConnectionStatus
+from seal.exception import PoolExhaustedException
 
 
 class MysqlConnection:
-    def __init__(self, connection: PyMySQLConnection, pool: 'ConnectionPool', create_time=time.time()):
+    def __init__(self, connection: PyMySQLConnection, pool: 'ConnectionPool', create_time=None):
         self.connection: PyMySQLConnection = connection
         self.pool: ConnectionPool = pool
         self.status: ConnectionStatus = ConnectionStatus.IDLE
-        self.create_time = create_time
+        self.create_time = create_time or time.time()
+        self.last_used_time = self.create_time
 
     def close(self):
         self.pool.release(self)
 
-    def cursor(self):
-        return self.connection.cursor()
+    def cursor(self, cursor_class=None):
+        return self.connection.cursor(cursor_class)
 
     def commit(self):
         self.connection.commit()
@@ -32,27 +37,68 @@ class MysqlConnection:
 
     def ping(self):
         self.connection.ping(reconnect=True)
+        self.last_used_time = time.time()
 
     def insert_id(self):
         return self.connection.insert_id()
 
 
+class _Waiter:
+    """
+    a thread blocked in get_connection, woken in FIFO order by release
+    """
+
+    def __init__(self, lock):
+        self.condition = threading.Condition(lock)
+        self.connection: MysqlConnection | None = None
+        self.may_create = False
+
+
 class ConnectionPool:
     def __init__(self, conf):
         self.conf = conf
 
-        self._connections: list[MysqlConnection] = []
         self._min_connections = conf['pool']['min_connections']
         self._max_connections = conf['pool']['max_connections']
+        # unit: second, 0 or None disables the check
+        self._idle_timeout = conf['pool'].get('idle_timeout', 600)
+        self._max_lifetime = conf['pool'].get('max_lifetime', 1800)
+        self._validation_interval = conf['pool'].get('validation_interval', 30)
+
+        # all bookkeeping below is guarded by _lock
+        self._lock = threading.Lock()
+        self._idle: deque[MysqlConnection] = deque()
+        self._waiters: deque[_Waiter] = deque()
+        self._size = 0  # idle + occupied + being created
+
+        self.warmup()
+
+    def warmup(self):
+        """
+        open min_connections connections concurrently, the cold start is bound by one connect instead of all of them
+        """
+        if self._min_connections <= 0:
+            return
+
+        concurrency = min(self._min_connections, self.conf['pool'].get('warmup_concurrency', 16))
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='seal-warmup') as executor:
+            futures = [executor.submit(self.new_connection) for _ in range(self._min_connections)]
+            connections, errors = [], []
+            for future in futures:
+                try:
+                    connections.append(future.result())
+                except Exception as e:
+                    errors.append(e)
 
-        for _ in range(self._min_connections):
-            mysql_connection: PyMySQLConnection = pymysql.connect(host=conf['host'],
-                                                                  port=conf['port'],
-                                                                  user=conf['user'],
-                                                                  password=conf['password'].encode('utf-8'),
-                                                                  database=conf['database'],
-                                                                  cursorclass=DictCursor)
-            self._connections.append(MysqlConnection(mysql_connection, self))
+        if len(errors) > 0:
+            for connection in connections:
+                connection.close()
+            raise errors[0]
+
+        with self._lock:
+            for connection in connections:
+                self._idle.append(MysqlConnection(connection, self))
+            self._size += len(connections)
 
     def new_connection(self):
         return pymysql.connect(host=self.conf['host'],
@@ -60,56 +106,166 @@ class ConnectionPool:
                                user=self.conf['user'],
                                password=self.conf['password'].encode('utf-8'),
                                database=self.conf['database'],
+                               local_infile=self.conf.get('local_infile', False),
                                cursorclass=DictCursor)
 
     def get_connection(self, timeout=3):
-        start_time = time.time()
+        """
+        timeout unit: second, None means wait forever
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._lock:
+            connection, may_create = self._occupy()
+            if connection is None and not may_create:
+                waiter = _Waiter(self._lock)
+                self._waiters.append(waiter)
+                while waiter.connection is None and not waiter.may_create:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._waiters.remove(waiter)
+                        raise PoolExhaustedException()
+                    waiter.condition.wait(remaining)
+                connection, may_create = waiter.connection, waiter.may_create
 
-        connection = self.occupy()
-        if connection is not None:
-            connection.ping()
-            return connection
+        if may_create:
+            return self._create()
+
+        # only validate connections that have not been used for a while
+        if self._validation_interval and time.time() - connection.last_used_time > self._validation_interval:
+            try:
+                connection.ping()
+            except Exception as e:
+                logger.warning(f'ping connection {id(connection)} failed: {e}')
+                self._discard(connection)
+                # the slot stays reserved for this borrow, _create gives it back to the pool if the connect fails too
+                return self._create()
+        return connection
 
-        if len(self._connections) < self._max_connections:
-            mysql_connection = self.new_connection()
-            connection = MysqlConnection(mysql_connection, self)
+    def _occupy(self) -> tuple[MysqlConnection | None, bool]:
+        # caller holds _lock
+        if self._idle and not self._waiters:
+            connection = self._idle.pop()
             connection.status = ConnectionStatus.OCCUPIED
-            self._connections.append(connection)
-            return connection
+            return connection, False
+        if self._size < self._max_connections:
+            self._size += 1
+            return None, True
+        return None, False
 
-        if timeout is not None:
-            raise Exception('No available connection')
+    def _create(self) -> MysqlConnection:
+        # a slot has already been reserved in _size
+        try:
+            connection = MysqlConnection(self.new_connection(), self)
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._hand_over_slot()
+            raise
+        connection.status = ConnectionStatus.OCCUPIED
+        return connection
 
-        while True:
-            connection = self.occupy()
-            if connection is not None:
-                connection.ping()
-                return connection
+    def _hand_over_slot(self):
+        # caller holds _lock, a slot has been freed
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.may_create = True
+            self._size += 1
+            waiter.condition.notify()
+
+    def _expired(self, connection: MysqlConnection, now: float) -> bool:
+        return bool(self._max_lifetime) and now - connection.create_time > self._max_lifetime
+
+    def release(self, mysql_connection: MysqlConnection):
+        now = time.time()
+        with self._lock:
+            if mysql_connection.status == ConnectionStatus.IDLE:
+                return
+
+            mysql_connection.last_used_time = now
+            if self._expired(mysql_connection, now):
+                self._size -= 1
+                self._hand_over_slot()
+            elif self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.connection = mysql_connection
+                waiter.condition.notify()
+                return
             else:
-                time.sleep(0.1)
+                # surplus connections linger here until the housekeeper finds them idle for too long
+                mysql_connection.status = ConnectionStatus.IDLE
+                self._idle.append(mysql_connection)
+                return
 
-                if timeout is not None and time.time() - start_time > timeout:
-                    raise Exception('No available connection')
+        self._discard(mysql_connection)
 
-    def occupy(self) -> MysqlConnection | None:
-        for connection in self._connections:
-            if connection.status == ConnectionStatus.IDLE:
+    # noinspection PyMethodMayBeStatic
+    def _discard(self, mysql_connection: MysqlConnection):
+        mysql_connection.status = ConnectionStatus.IDLE
+        try:
+            mysql_connection.connection.close()
+        except Exception as e:
+            logger.warning(f'close connection {id(mysql_connection)} failed: {e}')
+
+    def housekeep(self):
+        """
+        evict connections idle beyond idle_timeout (down to min_connections), retire connections older than
+        max_lifetime, validate stale ones and refill the pool. occupied connections are never touched.
+        """
+        now = time.time()
+        evicted = []
+        stale = []
+        with self._lock:
+            # the left end of the deque holds the connections released longest ago
+            for connection in list(self._idle):
+                if self._expired(connection, now):
+                    evicted.append(connection)
+                elif (self._idle_timeout and self._size - len(evicted) > self._min_connections
+                      and now - connection.last_used_time > self._idle_timeout):
+                    evicted.append(connection)
+                elif self._validation_interval and now - connection.last_used_time > self._validation_interval:
+                    stale.append(connection)
+
+            for connection in evicted + stale:
+                self._idle.remove(connection)
                 connection.status = ConnectionStatus.OCCUPIED
-                return connection
-        return None
+            for _ in evicted:
+                self._size -= 1
+                self._hand_over_slot()
 
-    def release(self, mysql_connection: MysqlConnection):
-        if len(self._connections) > self._min_connections:
-            mysql_connection.connection.close()
-            self._connections.remove(mysql_connection)
-        else:
-            mysql_connection.status = ConnectionStatus.IDLE
+            refill = max(self._min_connections - self._size, 0)
+            self._size += refill
 
-    def ping(self, seconds=60):
-        while True:
-            time.sleep(seconds)
-            ids = []
-            for connection in self._connections:
-                ids.append(id(connection))
+        for connection in evicted:
+            self._discard(connection)
+
+        for connection in stale:
+            try:
                 connection.ping()
-            logger.info(f'active connections {ids}')
+            except Exception as e:
+                logger.warning(f'ping connection {id(connection)} failed: {e}')
+                with self._lock:
+                    self._size -= 1
+                    self._hand_over_slot()
+                self._discard(connection)
+                continue
+            self.release(connection)
+
+        for _ in range(refill):
+            try:
+                connection = self._create()
+            except Exception as e:
+                logger.warning(f'refill connection failed: {e}')
+                continue
+            self.release(connection)
+
+        if len(evicted) > 0 or refill > 0:
+            logger.info(f'connection pool evicted {len(evicted)}, created {refill}, size {self._size}')
+
+    def ping(self, seconds=None):
+        while True:
+            time.sleep(seconds or 30)
+            try:
+                self.housekeep()
+            except Exception as e:
+                logger.exception(e)
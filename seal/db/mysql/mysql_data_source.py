@@ -1,8 +1,13 @@
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List
+
+from loguru import logger
 
 from seal.db.protocol import IExecutor
+from seal.db.slow_query import slow_query_log
 from .executor import MysqlExecutor
 from .mysql_connection import ConnectionPool
+from .replica import ReplicaSet
 from .table_info import TableField, TableInfo
 
 
@@ -11,7 +16,11 @@ class MysqlDataSource:
         self.name = name
         self.default_database = conf.get('database')
         self.connection_pool = ConnectionPool(conf)
-        self.executor: IExecutor = MysqlExecutor(self)
+        self.replica_set = ReplicaSet(conf)
+        self.executor: IExecutor = MysqlExecutor(self,
+                                                 batch_size=conf.get('insert_batch_size', 1000),
+                                                 max_allowed_packet=conf.get('max_allowed_packet', 1024000),
+                                                 slow_query_log=slow_query_log(self, conf, 'EXPLAIN '))
 
     def get_name(self) -> str:
         return self.name
@@ -20,7 +29,14 @@ class MysqlDataSource:
     def get_type(self) -> str:
         return 'mysql'
 
-    def get_connection(self):
+    def get_connection(self, read_only: bool = False):
+        """
+        read_only connections come from a healthy replica if there is one, otherwise from the primary
+        """
+        if read_only:
+            connection = self.replica_set.get_connection()
+            if connection is not None:
+                return connection
         return self.connection_pool.get_connection()
 
     def get_executor(self) -> IExecutor:
@@ -53,5 +69,35 @@ class MysqlDataSource:
             conn.commit()
             conn.close()
 
+    def load_columns(self, database: str) -> Dict[str, List[List[Any]]]:
+        """
+        columns of every table of the database in one information_schema query, each column as
+        [field, type, null, key, default, extra] like show columns
+        """
+        conn = self.get_connection()
+        c = conn.cursor()
+        try:
+            c.execute('select table_name as t, column_name as f, column_type as ty, is_nullable as n, '
+                      'column_key as k, column_default as d, extra as e '
+                      'from information_schema.columns where table_schema = %s '
+                      'order by table_name, ordinal_position', (database,))
+            tables = {}
+            for row in c.fetchall():
+                tables.setdefault(row['t'], []).append([row['f'], row['ty'], row['n'], row['k'], row['d'], row['e']])
+            return tables
+        finally:
+            c.close()
+            conn.close()
+
+    # noinspection PyMethodMayBeStatic
+    def parse_structure(self, table: str, columns: List[List[Any]]) -> Any:
+        return TableInfo(table=table, table_fields=[TableField(*column) for column in columns]).parse_model()
+
     def ping(self, seconds):
-        self.connection_pool.ping(seconds)
+        while True:
+            time.sleep(seconds or 30)
+            try:
+                self.connection_pool.housekeep()
+                self.replica_set.housekeep()
+            except Exception as e:
+                logger.exception(e)
@@ -0,0 +1,111 @@
+import random
+from typing import Dict, Any, List
+
+from loguru import logger
+
+from seal.exception import PoolExhaustedException
+from .mysql_connection import ConnectionPool, MysqlConnection
+
+
+class Replica:
+    def __init__(self, conf: Dict[str, Any]):
+        self.conf = conf
+        self.name = f'{conf["host"]}:{conf["port"]}'
+        self.weight = conf.get('weight', 1)
+        self.healthy = False
+        self.lag: int | None = None
+        self.connection_pool: ConnectionPool | None = None
+        self.open()
+
+    def open(self):
+        try:
+            self.connection_pool = ConnectionPool(self.conf)
+            self.healthy = True
+        except Exception as e:
+            logger.warning(f'open replica {self.name} failed: {e}')
+
+    def check(self, max_lag: int | None):
+        """
+        a replica is healthy when it answers and its replication lag is known and within max_lag (seconds).
+        a busy pool skips the check and keeps the current state, only a failed connect or query marks it unhealthy
+        """
+        if self.connection_pool is None:
+            self.open()
+            if self.connection_pool is None:
+                return
+
+        try:
+            connection = self.connection_pool.get_connection(timeout=0)
+        except PoolExhaustedException:
+            logger.debug('replica {} busy, check skipped', self.name)
+            return
+        except Exception as e:
+            self.mark_unhealthy(f'no connection: {e}')
+            return
+
+        cursor = connection.cursor()
+        try:
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except Exception:
+                # before mysql 8.0.22
+                cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                # not replicating, nothing to lag behind
+                self.lag = 0
+            else:
+                self.lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+
+            if self.lag is None:
+                self.mark_unhealthy('replication stopped')
+            elif max_lag is not None and self.lag > max_lag:
+                self.mark_unhealthy(f'lag {self.lag}s exceeds {max_lag}s')
+            else:
+                if not self.healthy:
+                    logger.info(f'replica {self.name} is healthy again, lag {self.lag}s')
+                self.healthy = True
+        except Exception as e:
+            self.mark_unhealthy(str(e))
+        finally:
+            cursor.close()
+            connection.close()
+
+    def mark_unhealthy(self, reason: str):
+        if self.healthy:
+            logger.warning(f'replica {self.name} is unhealthy: {reason}')
+        self.healthy = False
+
+
+class ReplicaSet:
+    def __init__(self, conf: Dict[str, Any]):
+        self.max_lag = conf.get('max_replica_lag')
+        # unit: second, 0 borrows without waiting
+        self.borrow_timeout = conf.get('replica_borrow_timeout', 0)
+        self.replicas: List[Replica] = []
+        for replica_conf in conf.get('replicas') or []:
+            # host, port and weight are required per replica, the rest is inherited from the primary
+            merged = {**conf, **replica_conf}
+            merged.pop('replicas', None)
+            self.replicas.append(Replica(merged))
+
+    def get_connection(self) -> MysqlConnection | None:
+        """
+        a busy replica is skipped, not marked unhealthy: an exhausted pool under a burst says nothing about its health,
+        only Replica.check decides that. None when every replica is busy or unhealthy, the read goes to the primary.
+        """
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        while len(healthy) > 0:
+            replica = random.choices(healthy, weights=[replica.weight for replica in healthy])[0]
+            try:
+                return replica.connection_pool.get_connection(timeout=self.borrow_timeout)
+            except Exception as e:
+                logger.debug('replica {} skipped: {}', replica.name, e)
+                healthy.remove(replica)
+        return None
+
+    def housekeep(self):
+        for replica in self.replicas:
+            replica.check(self.max_lag)
+            if replica.connection_pool is not None:
+                replica.connection_pool.housekeep()
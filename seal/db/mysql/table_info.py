@@ -1,6 +1,21 @@
-from dataclasses import make_dataclass, field
+import datetime
+from decimal import Decimal
 from typing import Any
 
+from seal.model.entity import build_model
+
+# leading word of the column type -> python type returned by pymysql
+_TYPES = {
+    'tinyint': int, 'smallint': int, 'mediumint': int, 'int': int, 'integer': int, 'bigint': int, 'year': int,
+    'decimal': Decimal, 'numeric': Decimal,
+    'float': float, 'double': float, 'real': float,
+    'char': str, 'varchar': str, 'tinytext': str, 'text': str, 'mediumtext': str, 'longtext': str,
+    'enum': str, 'set': str, 'json': str,
+    'binary': bytes, 'varbinary': bytes, 'tinyblob': bytes, 'blob': bytes, 'mediumblob': bytes, 'longblob': bytes,
+    'bit': bytes,
+    'date': datetime.date, 'datetime': datetime.datetime, 'timestamp': datetime.datetime, 'time': datetime.timedelta,
+}
+
 
 class TableField:
 
@@ -22,7 +37,14 @@ class TableInfo:
 
     def parse_model(self):
         if self.model is None:
-            self.model = make_dataclass(self.table,
-                                        [(table_field.field_, Any, field(default=None)) for table_field in
-                                         self.table_fields])
+            self.model = build_model(self.table,
+                                     [(table_field.field_, python_type(table_field.type_)) for table_field in
+                                      self.table_fields])
         return self.model
+
+
+def python_type(column_type: str) -> Any:
+    """
+    e.g. 'bigint unsigned' -> int, 'varchar(64)' -> str, 'decimal(10,2)' -> Decimal
+    """
+    return _TYPES.get(column_type.split('(')[0].split(' ')[0].lower(), Any)
@@ -0,0 +1,64 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from ..config import configurator
+
+_executor: ThreadPoolExecutor | None = None
+_count_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def default_max_workers() -> int:
+    """
+    sized relative to the mysql pools, a worker beyond the available connections would only wait for one
+    """
+    ratio = configurator.get_conf_default('seal', 'offload', 'ratio', default=1)
+    data_source_config = configurator.get_conf_default('seal', 'data_source', default={})
+    max_connections = sum(conf['pool']['max_connections'] for conf in data_source_config.values()
+                          if conf.get('dialect') == 'mysql' and 'pool' in conf)
+    return max(int(max_connections * ratio), 4)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                max_workers = configurator.get_conf_default('seal', 'offload', 'max_workers') or default_max_workers()
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='seal-offload')
+                logger.info(f'offload executor started with {max_workers} workers')
+    return _executor
+
+
+def get_count_executor() -> ThreadPoolExecutor:
+    """
+    side pool for the COUNT of page(count='concurrent'). the caller blocks on the count, often from an offload worker,
+    so it can't share the offload pool: with every worker inside page() no count could ever start.
+    """
+    global _count_executor
+    if _count_executor is None:
+        with _lock:
+            if _count_executor is None:
+                max_workers = configurator.get_conf_default('seal', 'offload', 'count_workers', default=4)
+                _count_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='seal-count')
+    return _count_executor
+
+
+def offload_enabled(offload: bool | None = None) -> bool:
+    if offload is not None:
+        return offload
+    return configurator.get_conf_default('seal', 'offload', 'enabled', default=False)
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    run a blocking function on the offload executor, web_context and sql_context (all ContextVars) are propagated
+    """
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(get_executor(),
+                                                            functools.partial(ctx.run, func, *args, **kwargs))
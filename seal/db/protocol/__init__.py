@@ -1,5 +1,7 @@
+from .async_data_source_protocol import IAsyncDataSource
+from .async_executor_protocol import IAsyncExecutor
 from .data_source_protocol import IDataSource
 from .database_connection_protocol import IDatabaseConnection
 from .executor_protocol import IExecutor
 
-__all__ = ['IExecutor', 'IDataSource', 'IDatabaseConnection']
+__all__ = ['IExecutor', 'IDataSource', 'IDatabaseConnection', 'IAsyncExecutor', 'IAsyncDataSource']
@@ -0,0 +1,29 @@
+from typing import Protocol, Any
+
+from .async_executor_protocol import IAsyncExecutor
+
+
+class IAsyncDataSource(Protocol):
+    def get_name(self) -> str:
+        ...
+
+    def get_type(self) -> str:
+        ...
+
+    def get_executor(self) -> IAsyncExecutor:
+        ...
+
+    async def load_structure(self, database: str, table: str) -> Any:
+        ...
+
+    async def get_connection(self) -> Any:
+        ...
+
+    async def release_connection(self, connection: Any):
+        ...
+
+    def get_default_database(self) -> str:
+        ...
+
+    async def close(self):
+        ...
@@ -0,0 +1,36 @@
+from typing import Protocol, Tuple, Any, List, AsyncIterator, Dict
+
+from seal.model.result import Result, Results
+
+
+class IAsyncExecutor(Protocol):
+
+    async def find(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Result:
+        ...
+
+    async def find_list(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Results:
+        ...
+
+    def find_iter(self, sql: str, args: Tuple[Any, ...], batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        ...
+
+    async def count(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        ...
+
+    async def estimate_count(self, sql: str, args: Tuple[Any, ...], table: str) -> int | None:
+        ...
+
+    async def update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        ...
+
+    async def insert(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        ...
+
+    async def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]], batch_size: int | None = None) -> int | None:
+        ...
+
+    async def custom_query(self, sql: str, args=Tuple[Any, ...]) -> Results:
+        ...
+
+    async def custom_update(self, sql: str, args=Tuple[Any, ...]) -> int | None:
+        ...
@@ -1,4 +1,4 @@
-from typing import Protocol, Any
+from typing import Protocol, Any, Dict, List
 
 from .database_connection_protocol import IDatabaseConnection
 from .executor_protocol import IExecutor
@@ -17,7 +17,13 @@ class IDataSource(Protocol):
     def load_structure(self, database: str, table: str) -> Any:
         ...
 
-    def get_connection(self) -> IDatabaseConnection:
+    def load_columns(self, database: str) -> Dict[str, List[List[Any]]]:
+        ...
+
+    def parse_structure(self, table: str, columns: List[List[Any]]) -> Any:
+        ...
+
+    def get_connection(self, read_only: bool = False) -> IDatabaseConnection:
         ...
 
     def get_default_database(self) -> str:
@@ -1,4 +1,4 @@
-from typing import Protocol, Tuple, Any, List
+from typing import Protocol, Tuple, Any, List, Iterator, Dict, Iterable
 
 from seal.model.result import Result, Results
 
@@ -11,16 +11,26 @@ class IExecutor(Protocol):
     def find_list(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Results:
         ...
 
+    def find_iter(self, sql: str, args: Tuple[Any, ...], batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        ...
+
     def count(self, sql: str, args: Tuple[Any, ...]) -> int | None:
         ...
 
+    def estimate_count(self, sql: str, args: Tuple[Any, ...], table: str) -> int | None:
+        ...
+
     def update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
         ...
 
     def insert(self, sql: str, args: Tuple[Any, ...]) -> int | None:
         ...
 
-    def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]]) -> int | None:
+    def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]], batch_size: int | None = None) -> int | None:
+        ...
+
+    def load(self, table: str, columns: List[str], rows: Iterable[Tuple[Any, ...]] | None = None,
+             file_path: str | None = None, constants: Dict[str, Any] | None = None, **options) -> Dict[str, Any]:
         ...
 
     def custom_query(self, sql: str, args=Tuple[Any, ...]) -> Results:
@@ -0,0 +1,101 @@
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .transaction import sql_context
+from ..cache import LRUCache
+
+# tables written by a custom statement
+_WRITE_TABLE_PATTERN = re.compile(r'\b(?:UPDATE|INTO|FROM|JOIN)\s+`?([\w.]+)`?', re.IGNORECASE)
+
+
+class QueryCache:
+    """
+    query results tagged by table. a write bumps the table's generation instead of scanning keys,
+    entries of older generations are never read again and age out of the lru.
+    """
+
+    def __init__(self, capacity: int = 10240):
+        self._entries = LRUCache(capacity)
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, tag: str, key: Any, ttl: int, func: Callable[[], Any]) -> Any:
+        entry_key, hit, value = self.lookup(tag, key)
+        if not hit:
+            value = func()
+            self.store(entry_key, ttl, value)
+        return copy_result(value)
+
+    async def fetch_async(self, tag: str, key: Any, ttl: int, func: Callable[[], Awaitable[Any]]) -> Any:
+        entry_key, hit, value = self.lookup(tag, key)
+        if not hit:
+            value = await func()
+            self.store(entry_key, ttl, value)
+        return copy_result(value)
+
+    def lookup(self, tag: str, key: Any) -> Tuple[str, bool, Any]:
+        with self._lock:
+            # the generation is part of the key, a write makes every older entry of the table unreachable
+            entry_key = f'{tag}#{self._global_generation}.{self._generations.get(tag, 0)}#{key!r}'
+            entry = self._entries.get(entry_key)
+            hit = entry is not None and entry[0] > time.time()
+            self.count(tag, 'hits' if hit else 'misses')
+        return entry_key, hit, entry[1] if hit else None
+
+    def store(self, entry_key: str, ttl: int, value: Any):
+        with self._lock:
+            self._entries.set(entry_key, (time.time() + ttl, value))
+
+    def invalidate(self, tag: str):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            self.count(tag, 'invalidations')
+
+        # rows written inside a transaction become visible on commit, readers may have cached the old ones meanwhile
+        ctx = sql_context.get()
+        if ctx.tx() is not None:
+            ctx.after_completion(lambda: self.invalidate(tag))
+
+    def invalidate_sql(self, data_source, sql: str):
+        tables = _WRITE_TABLE_PATTERN.findall(sql)
+        if len(tables) == 0:
+            self.invalidate_all()
+            return
+        for table in tables:
+            self.invalidate(table_tag(data_source, table))
+
+    def invalidate_all(self):
+        with self._lock:
+            self._global_generation += 1
+
+    def count(self, tag: str, name: str):
+        # caller holds _lock
+        if tag not in self._stats:
+            self._stats[tag] = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._stats[tag][name] += 1
+
+    def stats(self, tag: str | None = None) -> Dict[str, Any]:
+        with self._lock:
+            if tag is not None:
+                return dict(self._stats.get(tag, {'hits': 0, 'misses': 0, 'invalidations': 0}))
+            return {k: dict(v) for k, v in self._stats.items()}
+
+
+def table_tag(data_source, table: str) -> str:
+    if '.' not in table and data_source.get_default_database():
+        table = f'{data_source.get_default_database()}.{table}'
+    return f'{data_source.get_name()}:{table}'
+
+
+def copy_result(value: Any) -> Any:
+    # cached rows are shared, callers get their own list and dicts
+    if hasattr(value, 'copy'):
+        return value.copy()
+    return value
+
+
+query_cache = QueryCache()
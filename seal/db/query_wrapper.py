@@ -1,13 +1,28 @@
+import base64
+import contextvars
+import json
 from dataclasses import fields
-from typing import Any, List, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Iterator
 
 from seal.db.protocol import IDataSource
+from seal.cache import Cache
 from seal.model.result import Result, Results
-from .sql_builder import build_select, build_count
+from . import offload
+from .condition import RowCondition
+from .query_cache import query_cache, table_tag
+from .sql_builder import build_select, build_count, placeholder
 from .structures import structures
+from .transaction import sql_context
 from .wrapper import Wrapper
+from ..enum.operator import Operator
 from ..types import Column
 
+COUNT_STRATEGIES = ('exact', 'concurrent', 'cached', 'estimate', 'none')
+
+# count statement + args -> total, for page(count='cached')
+_count_cache = Cache()
+
 
 class QueryWrapper(Wrapper):
     def __init__(self,
@@ -29,21 +44,18 @@ class QueryWrapper(Wrapper):
             self.table = f'{database}.{table}'
         self.data_source = data_source
 
-        self.result_type = structures.get(data_source=self.data_source.get_name(),
-                                          database=database or data_source.get_default_database(),
-                                          table=table)
-        if self.result_type is None:
-            self.result_type = self.data_source.load_structure(database, table)
-            structures.register(data_source=self.data_source.get_name(),
-                                database=database or data_source.get_default_database(),
-                                table=table,
-                                structure=self.result_type)
+        self.result_type = self.resolve_structure(database, table)
 
         self.limit_ = None
         self.offset = None
         self.order_by = None
         self.field_list = []
         self.ignore_fields = []
+        self.cache_ttl: int | None = None
+        self.cache_key: Any = None
+
+    def resolve_structure(self, database: str | None, table: str) -> Any:
+        return structures.load(self.data_source, database, table)
 
     def select(self, *field_list) -> 'QueryWrapper':
         self.field_list = field_list
@@ -73,9 +85,18 @@ class QueryWrapper(Wrapper):
         self.offset = offset
         return self
 
+    def cached(self, ttl: int = 60, key: Any = None) -> 'QueryWrapper':
+        """
+        serve the result from the query cache for up to ttl seconds, writes to the table through seal invalidate it.
+        key replaces the statement args in the cache key. ignored inside a transaction.
+        """
+        self.cache_ttl = ttl
+        self.cache_key = key
+        return self
+
     def one(self, as_dict=False, **options) -> Any:
         sql, args = self.build_statement(**options)
-        result: Result = self.data_source.get_executor().find(sql, args, self.result_type)
+        result: Result = self.fetch('find', sql, args, self.result_type)
         if as_dict:
             return result.as_dict()
         return result.get()
@@ -85,7 +106,7 @@ class QueryWrapper(Wrapper):
 
     def list(self, as_dict=False, **options) -> List[Any]:
         sql, args = self.build_statement(**options)
-        results: Results = self.data_source.get_executor().find_list(sql, args, self.result_type)
+        results: Results = self.fetch('find_list', sql, args, self.result_type)
         if as_dict:
             return results.as_dict()
         return results.get()
@@ -93,35 +114,180 @@ class QueryWrapper(Wrapper):
     def d_list(self, **options) -> List[dict]:
         return self.list(as_dict=True, **options)
 
-    def page(self, page: int, page_size: int, as_dict=False, **options) -> Tuple[List[Any], int]:
-        self.limit_ = page_size
+    def columns(self, numpy: bool = False, **options) -> Dict[str, Any]:
+        """
+        column oriented result for aggregations: column name -> array.array / numpy array / list, see Results.to_columns
+        """
+        sql, args = self.build_statement(**options)
+        results: Results = self.fetch('find_list', sql, args, self.result_type)
+        return results.to_columns(numpy)
+
+    def stream(self, batch_size: int = 1000, as_dict=False, **options) -> Iterator[Any]:
+        """
+        lazily yield beans (or dicts) fetched batch_size rows at a time, memory stays flat whatever the result size.
+        the connection is held until the generator is exhausted or closed.
+        """
+        sql, args = self.build_statement(**options)
+        rows = self.data_source.get_executor().find_iter(sql, args, batch_size)
+        try:
+            for row in rows:
+                yield row if as_dict else self.result_type(**row)
+        finally:
+            rows.close()
+
+    def iter(self, **options) -> Iterator[Any]:
+        return self.stream(**options)
+
+    def seek(self, after: str | None = None, size: int = 20, order_by: Column = 'id', desc=False, key: Column = 'id',
+             as_dict=False, **options) -> Tuple[List[Any], str | None]:
+        """
+        keyset pagination: rows after the opaque token `after`, ordered by (order_by, key).
+        unlike page() the cost does not grow with the depth, the returned token is None on the last page.
+        """
+        sql, args, keys = self.build_seek(after, size, order_by, desc, key, **options)
+        results: Results = self.fetch('find_list', sql, args, self.result_type)
+        return seek_page(results, keys, size, as_dict)
+
+    def d_seek(self, after: str | None = None, size: int = 20, **options) -> Tuple[List[dict], str | None]:
+        return self.seek(after, size, as_dict=True, **options)
+
+    def page(self, page: int, page_size: int, as_dict=False, count: str = 'exact', count_ttl: int = 60,
+             **options) -> Tuple[List[Any], int | bool | None]:
+        """
+        count strategies:
+        exact: COUNT(1) after the page query.
+        concurrent: the page and COUNT(1) run in parallel on two pooled connections (exact inside a transaction).
+        cached: COUNT(1) memoized per statement and args for count_ttl seconds.
+        estimate: optimizer row estimate (EXPLAIN / information_schema.TABLES), exact where none is available.
+        none: no count, page_size + 1 rows are fetched and a has-next flag is returned instead.
+        """
+        if count not in COUNT_STRATEGIES:
+            raise ValueError(f'unknown count strategy: {count}')
+
+        executor = self.data_source.get_executor()
         self.offset = (page - 1) * page_size
+        if count == 'none':
+            self.limit_ = page_size + 1
+            sql, args = self.build_statement(**options)
+            results: Results = self.fetch('find_list', sql, args, self.result_type)
+            has_next = trim_page(results, page_size)
+            if as_dict:
+                return results.as_dict(), has_next
+            return results.get(), has_next
+
+        self.limit_ = page_size
         sql, args = self.build_statement(**options)
-        results: Results = self.data_source.get_executor().find_list(sql, args, self.result_type)
-        count = self.count()
+        count_sql, count_args = build_count(self)
+
+        if count == 'concurrent' and sql_context.get().tx() is None:
+            future = offload.get_count_executor().submit(contextvars.copy_context().run, self.fetch, 'count',
+                                                         count_sql, count_args)
+            results: Results = self.fetch('find_list', sql, args, self.result_type)
+            total = future.result()
+        else:
+            results: Results = self.fetch('find_list', sql, args, self.result_type)
+            if count == 'cached':
+                cache_key = f'{self.data_source.get_name()}:{count_sql}:{count_args!r}'
+                total = _count_cache.get(cache_key)
+                if total is None:
+                    total = executor.count(count_sql, count_args)
+                    _count_cache.set(cache_key, total, ttl=count_ttl)
+            elif count == 'estimate':
+                total = executor.estimate_count(count_sql, count_args, self.table)
+                if total is None:
+                    total = self.fetch('count', count_sql, count_args)
+            else:
+                total = self.fetch('count', count_sql, count_args)
+
         if as_dict:
-            return results.as_dict(), count
-        return results.get(), count
+            return results.as_dict(), total
+        return results.get(), total
 
-    def d_page(self, page: int, page_size: int, **options) -> Tuple[List[dict], int]:
+    def d_page(self, page: int, page_size: int, **options) -> Tuple[List[dict], int | bool | None]:
         return self.page(page, page_size, as_dict=True, **options)
 
     def count(self):
         sql, args = build_count(self)
-        return self.data_source.get_executor().count(sql, args)
+        return self.fetch('count', sql, args)
+
+    def fetch(self, method: str, sql: str, args: Tuple[Any, ...], *extra) -> Any:
+        executor_method = getattr(self.data_source.get_executor(), method)
+        if self.cache_ttl is None or sql_context.get().tx() is not None:
+            return executor_method(sql, args, *extra)
+        key = (method, sql, args if self.cache_key is None else self.cache_key)
+        return query_cache.fetch(table_tag(self.data_source, self.table), key, self.cache_ttl,
+                                 lambda: executor_method(sql, args, *extra))
+
+    def build_seek(self, after: str | None, size: int, order_by: Column, desc: bool, key: Column,
+                   **options) -> Tuple[str, Tuple[Any, ...], Tuple[Column, ...]]:
+        keys = (order_by,) if order_by == key else (order_by, key)
+        if after is not None:
+            values = decode_seek_token(after)
+            if len(values) != len(keys):
+                raise ValueError('invalid seek token')
+            self.condition_tree.add_condition(RowCondition(keys, values, Operator.LT if desc else Operator.GT))
+
+        self.order_by = [f'{k} {"desc" if desc else "asc"}' for k in keys]
+        self.limit_ = size
+        self.offset = None
+        if len(self.field_list) > 0:
+            self.field_list = list(self.field_list) + [k for k in keys if k not in self.field_list]
+
+        sql, args = self.build_statement(**options)
+        return sql, args, keys
 
     def build_statement(self, **options) -> Tuple[str, Tuple[Any, ...]]:
         self.handle_public_fields(**options)
 
         if len(self.field_list) == 0:
-            self.field_list = [field.name for field in fields(self.result_type) if field.name not in self.ignore_fields]
+            self.field_list = [name for name in field_names(self.result_type) if name not in self.ignore_fields]
         return build_select(self)
 
     def build_sql(self, **options) -> str:
         sql, args = self.build_statement(**options)
+        p = placeholder(self)
         for arg in args:
             if isinstance(arg, str):
-                sql = sql.replace('?', f"'{arg}'", 1)
+                sql = sql.replace(p, f"'{arg}'", 1)
             else:
-                sql = sql.replace('?', str(arg), 1)
+                sql = sql.replace(p, str(arg), 1)
         return sql
+
+
+@lru_cache(maxsize=1024)
+def field_names(result_type) -> Tuple[str, ...]:
+    return tuple([field.name for field in fields(result_type)])
+
+
+def trim_page(results: Results, page_size: int) -> bool:
+    """
+    drop the extra row fetched by page(count='none'), True when there was one, i.e. a next page exists
+    """
+    has_next = results.rows is not None and len(results.rows) > page_size
+    if has_next:
+        results.rows = results.rows[:page_size]
+    return has_next
+
+
+def seek_page(results: Results, keys: Tuple[Column, ...], size: int, as_dict: bool) -> Tuple[List[Any], str | None]:
+    rows = results.as_dict()
+    next_token = None
+    if len(rows) == size:
+        next_token = encode_seek_token([rows[-1][k] for k in keys])
+    if as_dict:
+        return rows, next_token
+    return results.get(), next_token
+
+
+def encode_seek_token(values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode('utf-8')).decode('ascii')
+
+
+def decode_seek_token(token: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError('invalid seek token')
+    if not isinstance(values, list):
+        raise ValueError('invalid seek token')
+    return values
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from loguru import logger
+
+# bumped whenever the file layout changes, older files are ignored
+FORMAT = 1
+
+
+class SchemaCache:
+    """
+    column metadata of a whole database persisted as one json file per data source and database.
+    a file is only used when it was written with the same format and the same configured version,
+    bump seal.schema.version (e.g. to the migration version) after a schema change.
+    """
+
+    def __init__(self, path: str, version: str | None = None):
+        self.path = path
+        self.version = version
+
+    def file(self, data_source: str, database: str | None) -> str:
+        return os.path.join(self.path, f'{data_source}.{database or "main"}.json')
+
+    def read(self, data_source: str, database: str | None) -> Dict[str, List[List[Any]]] | None:
+        file = self.file(data_source, database)
+        if not os.path.exists(file):
+            return None
+        try:
+            with open(file, encoding='utf-8') as f:
+                content = json.load(f)
+        except Exception as e:
+            logger.warning(f'read schema cache {file} failed: {e}')
+            return None
+        if content.get('format') != FORMAT or content.get('version') != self.version:
+            return None
+        return content['tables']
+
+    def write(self, data_source: str, database: str | None, tables: Dict[str, List[List[Any]]]):
+        os.makedirs(self.path, exist_ok=True)
+        content = {'format': FORMAT, 'version': self.version, 'created_at': time.time(), 'tables': tables}
+        # several workers may boot at once, readers only ever see a complete file
+        fd, temp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(content, f, default=str)
+            os.replace(temp, self.file(data_source, database))
+        except Exception as e:
+            logger.warning(f'write schema cache {self.file(data_source, database)} failed: {e}')
+            if os.path.exists(temp):
+                os.remove(temp)
+
+    def remove(self, data_source: str, database: str | None):
+        file = self.file(data_source, database)
+        if os.path.exists(file):
+            os.remove(file)
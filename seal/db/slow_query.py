@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+from typing import Any, Dict, List
+
+from loguru import logger
+
+from ..config import configurator
+from .offload import get_executor
+
+SEAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPLAINABLE = ('select', 'update', 'delete', 'with')
+
+
+class SlowQueryLog:
+    """
+    statements slower than threshold_ms are logged with extra slow_query=True, so a dedicated sink can pick them up.
+    the first occurrence of each sql shape gets its plan captured: explain_prefix + sql runs on a side connection
+    of the data source, on the offload executor, and the entry is logged once the plan is there.
+    """
+
+    def __init__(self, data_source: Any, threshold_ms: float, explain_prefix: str | None = None,
+                 max_shapes: int = 10000):
+        self.data_source = data_source
+        self.threshold = threshold_ms / 1000
+        self.explain_prefix = explain_prefix
+        self.max_shapes = max_shapes
+        self.explained: set = set()
+        self._lock = threading.Lock()
+
+    def check(self, sql: str, args: Any, seconds: float, rows: int):
+        if seconds < self.threshold:
+            return
+        entry = {'duration_ms': round(seconds * 1000, 2), 'rows': rows, 'data_source': self.data_source.get_name(),
+                 'location': caller_location(), 'sql': sql}
+        if self.first_occurrence(sql):
+            get_executor().submit(self.explain_and_log, entry, sql, args)
+        else:
+            log(entry)
+
+    def first_occurrence(self, sql: str) -> bool:
+        if self.explain_prefix is None or not sql.lstrip()[:6].lower().startswith(EXPLAINABLE):
+            return False
+        with self._lock:
+            if sql in self.explained:
+                return False
+            if len(self.explained) >= self.max_shapes:
+                self.explained.clear()
+            self.explained.add(sql)
+            return True
+
+    def explain_and_log(self, entry: Dict[str, Any], sql: str, args: Any):
+        try:
+            entry['plan'] = self.explain(sql, args)
+        except Exception as e:
+            entry['plan'] = f'explain failed: {e}'
+        log(entry)
+
+    def explain(self, sql: str, args: Any) -> str:
+        connection = self.data_source.get_connection()
+        cursor = connection.cursor()
+        try:
+            cursor.execute(self.explain_prefix + sql, args or ())
+            return format_plan(cursor.fetchall())
+        finally:
+            cursor.close()
+            try:
+                # a non-autocommit connection must not go back to the pool with the snapshot EXPLAIN opened
+                connection.rollback()
+            except Exception:
+                # sqlite refuses ROLLBACK outside a transaction, its side connection is closed for good anyway
+                pass
+            connection.close()
+
+
+def slow_query_log(data_source: Any, conf: Dict[str, Any], explain_prefix: str | None = None) -> SlowQueryLog | None:
+    """
+    the data source conf slow_query_ms wins over seal.slow_query.threshold_ms, no threshold turns the log off
+    """
+    threshold_ms = conf.get('slow_query_ms', configurator.get_conf_default('seal', 'slow_query', 'threshold_ms'))
+    if threshold_ms is None:
+        return None
+    if not configurator.get_conf_default('seal', 'slow_query', 'explain', default=True):
+        explain_prefix = None
+    return SlowQueryLog(data_source, threshold_ms, explain_prefix)
+
+
+def caller_location() -> str:
+    """
+    file:line of the first frame outside seal, i.e. the application code that issued the statement
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(SEAL_DIR + os.sep) and not filename.endswith('contextlib.py'):
+            return f'{filename}:{frame.f_lineno}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def format_plan(rows: List[Any]) -> str:
+    lines = []
+    for row in rows:
+        if isinstance(row, dict):
+            # sqlite query plans only carry a meaningful detail column
+            lines.append(row['detail'] if 'detail' in row else
+                         ' '.join([f'{k}={v}' for k, v in row.items() if v is not None]))
+        else:
+            lines.append(' '.join([str(v) for v in row if v is not None]))
+    return ' | '.join(lines)
+
+
+def log(entry: Dict[str, Any]):
+    plan = f' plan: {entry["plan"]}' if 'plan' in entry else ''
+    logger.bind(slow_query=True).warning(
+        f'slow query {entry["duration_ms"]}ms rows={entry["rows"]} data_source={entry["data_source"]} '
+        f'at {entry["location"]}: {entry["sql"]}{plan}')
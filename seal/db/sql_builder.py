@@ -1,51 +1,114 @@
-from typing import Any, Tuple, List, Callable
+from typing import Any, Tuple, List, Callable, Dict
 
-from loguru import logger
 
+def ignore_keyword(insert_wrapper) -> str:
+    if insert_wrapper.data_source.get_type() == 'mysql':
+        return 'IGNORE'
+    return 'OR IGNORE'
 
-def build_select(query_wrapper) -> Tuple[str, Tuple[Any, ...]]:
-    sql = f'SELECT {",".join(query_wrapper.field_list)} FROM {query_wrapper.table}'
-    args = ()
-    if len(query_wrapper.condition_tree.conditions) > 0:
-        exp, args = query_wrapper.condition_tree.parse()
-        sql += ' WHERE ' + exp
-    if query_wrapper.order_by is not None:
-        sql += f' ORDER BY {",".join(query_wrapper.order_by)}'
-    if query_wrapper.limit_ is not None:
-        sql += f' LIMIT {query_wrapper.limit_}'
-    if query_wrapper.offset is not None:
-        sql += f' OFFSET {query_wrapper.offset}'
 
-    return sql, args
+# statement shape -> compiled sql text, only the args are rebuilt per call
+_statement_cache: Dict[tuple, str] = {}
+_STATEMENT_CACHE_SIZE = 4096
+
+
+def placeholder(wrapper) -> str:
+    # pymysql expects pyformat, compiling it in spares the executor a replace per call
+    if wrapper.data_source.get_type() == 'mysql':
+        return '%s'
+    return '?'
+
+
+def cached_statement(key: tuple, compile_func: Callable[[], str]) -> str:
+    sql = _statement_cache.get(key)
+    if sql is None:
+        sql = compile_func()
+        if len(_statement_cache) >= _STATEMENT_CACHE_SIZE:
+            _statement_cache.clear()
+        _statement_cache[key] = sql
+    return sql
+
+
+def clear_statement_cache():
+    _statement_cache.clear()
+
+
+def where_args(wrapper) -> Tuple[Any, ...]:
+    args = []
+    wrapper.condition_tree.collect_args(args)
+    return tuple(args)
+
+
+def build_select(query_wrapper) -> Tuple[str, Tuple[Any, ...]]:
+    p = placeholder(query_wrapper)
+    tree = query_wrapper.condition_tree
+    order_by = tuple(query_wrapper.order_by) if query_wrapper.order_by is not None else None
+    has_limit = query_wrapper.limit_ is not None
+    has_offset = query_wrapper.offset is not None
+    key = ('select', p, query_wrapper.table, tuple(query_wrapper.field_list), tree.shape(), order_by, has_limit,
+           has_offset)
+
+    def compile_select():
+        sql = f'SELECT {",".join(query_wrapper.field_list)} FROM {query_wrapper.table}'
+        if len(tree.conditions) > 0:
+            sql += ' WHERE ' + tree.compile(p)
+        if order_by is not None:
+            sql += f' ORDER BY {",".join(order_by)}'
+        if has_limit:
+            sql += f' LIMIT {p}'
+        if has_offset:
+            sql += f' OFFSET {p}'
+        return sql
+
+    args = where_args(query_wrapper)
+    if has_limit:
+        args += (query_wrapper.limit_,)
+    if has_offset:
+        args += (query_wrapper.offset,)
+    return cached_statement(key, compile_select), args
 
 
 def build_count(query_wrapper) -> Tuple[str, Tuple[Any, ...]]:
-    sql = f'SELECT COUNT(1) FROM {query_wrapper.table}'
-    args = ()
-    if len(query_wrapper.condition_tree.conditions) > 0:
-        exp, args = query_wrapper.condition_tree.parse()
-        sql += ' WHERE ' + exp
+    p = placeholder(query_wrapper)
+    tree = query_wrapper.condition_tree
+    key = ('count', p, query_wrapper.table, tree.shape())
 
-    return sql, args
+    def compile_count():
+        sql = f'SELECT COUNT(1) FROM {query_wrapper.table}'
+        if len(tree.conditions) > 0:
+            sql += ' WHERE ' + tree.compile(p)
+        return sql
+
+    return cached_statement(key, compile_count), where_args(query_wrapper)
 
 
 def build_update(update_wrapper) -> Tuple[str, Tuple[Any, ...]]:
-    sql = f'UPDATE {update_wrapper.table} SET {",".join([f"{k}=?" for k in update_wrapper.update_fields.keys()])}'
-    args = tuple(update_wrapper.update_fields.values())
-    if len(update_wrapper.condition_tree.conditions) > 0:
-        exp, args2 = update_wrapper.condition_tree.parse()
-        sql += ' WHERE ' + exp
-        args += args2
-    return sql, args
+    p = placeholder(update_wrapper)
+    tree = update_wrapper.condition_tree
+    key = ('update', p, update_wrapper.table, tuple(update_wrapper.update_fields.keys()), tree.shape())
+
+    def compile_update():
+        sql = f'UPDATE {update_wrapper.table} SET {",".join([f"{k}={p}" for k in update_wrapper.update_fields.keys()])}'
+        if len(tree.conditions) > 0:
+            sql += ' WHERE ' + tree.compile(p)
+        return sql
+
+    args = tuple(update_wrapper.update_fields.values()) + where_args(update_wrapper)
+    return cached_statement(key, compile_update), args
 
 
 def build_delete(update_wrapper) -> Tuple[str, Tuple[Any, ...]]:
-    sql = f'DELETE FROM {update_wrapper.table}'
-    args = ()
-    if len(update_wrapper.condition_tree.conditions) > 0:
-        exp, args = update_wrapper.condition_tree.parse()
-        sql += ' WHERE ' + exp
-    return sql, args
+    p = placeholder(update_wrapper)
+    tree = update_wrapper.condition_tree
+    key = ('delete', p, update_wrapper.table, tree.shape())
+
+    def compile_delete():
+        sql = f'DELETE FROM {update_wrapper.table}'
+        if len(tree.conditions) > 0:
+            sql += ' WHERE ' + tree.compile(p)
+        return sql
+
+    return cached_statement(key, compile_delete), where_args(update_wrapper)
 
 
 def build_insert(insert_wrapper, data, duplicated_key_update=False, duplicated_key_ignore=False) -> Tuple[str, Tuple[Any, ...]]:
@@ -53,7 +116,7 @@ def build_insert(insert_wrapper, data, duplicated_key_update=False, duplicated_k
     if isinstance(data, dict):
         keys = data.keys()
 
-    sql = f'INSERT {"OR IGNORE" if duplicated_key_ignore else ""} INTO {insert_wrapper.table} ({",".join([field for field in insert_wrapper.insert_fields if keys is None or field in keys])}) VALUES ({",".join(["?" for field in insert_wrapper.insert_fields if keys is None or field in keys])})'
+    sql = f'INSERT {ignore_keyword(insert_wrapper) if duplicated_key_ignore else ""} INTO {insert_wrapper.table} ({",".join([field for field in insert_wrapper.insert_fields if keys is None or field in keys])}) VALUES ({",".join(["?" for field in insert_wrapper.insert_fields if keys is None or field in keys])})'
 
     if isinstance(data, dict):
         args = tuple([data[field] for field in insert_wrapper.insert_fields if field in keys])
@@ -72,23 +135,17 @@ def build_insert_bulk(insert_wrapper, data_list, duplicated_key_update=False, du
     if isinstance(data, dict):
         keys = data.keys()
 
-    sql = f'INSERT {"OR IGNORE" if duplicated_key_ignore else ""} INTO {insert_wrapper.table} ({",".join([field for field in insert_wrapper.insert_fields if keys is None or field in keys])}) VALUES ({",".join(["?" for field in insert_wrapper.insert_fields if keys is None or field in keys])})'
+    sql = f'INSERT {ignore_keyword(insert_wrapper) if duplicated_key_ignore else ""} INTO {insert_wrapper.table} ({",".join([field for field in insert_wrapper.insert_fields if keys is None or field in keys])}) VALUES ({",".join(["?" for field in insert_wrapper.insert_fields if keys is None or field in keys])})'
 
     if duplicated_key_update:
-        sql += f' ON DUPLICATE KEY UPDATE {",".join([f"{field}=?" for field in insert_wrapper.insert_fields])}'
+        # VALUES(field) instead of placeholders keeps the statement rewritable into one multi-row INSERT
+        sql += f' ON DUPLICATE KEY UPDATE {",".join([f"{field}=VALUES({field})" for field in insert_wrapper.insert_fields if keys is None or field in keys])}'
 
-    if duplicated_key_update:
-        if isinstance(data, dict):
-            args = [tuple([data[field] for field in insert_wrapper.insert_fields if field in keys]) * 2 for data in
-                    data_list]
-        else:
-            args = [tuple([getattr(data, field) for field in insert_wrapper.insert_fields]) * 2 for data in data_list]
+    if isinstance(data, dict):
+        args = [tuple([data[field] for field in insert_wrapper.insert_fields if field in keys]) for data
+                in data_list]
     else:
-        if isinstance(data, dict):
-            args = [tuple([data[field] for field in insert_wrapper.insert_fields if field in keys]) for data
-                    in data_list]
-        else:
-            args = [tuple([getattr(data, field) for field in insert_wrapper.insert_fields]) for data in data_list]
+        args = [tuple([getattr(data, field) for field in insert_wrapper.insert_fields]) for data in data_list]
     return sql, args
 
 
@@ -97,7 +154,7 @@ def build_insert_iterator(insert_wrapper, data_list, duplicated_key_update=False
     if isinstance(data_list[0], dict):
         keys = data_list[0].keys()
 
-    sql = f'INSERT {"OR IGNORE" if duplicated_key_ignore else ""} INTO {insert_wrapper.table} ({",".join([field for field in insert_wrapper.insert_fields if keys is None or field in keys])}) VALUES ({",".join(["?" for field in insert_wrapper.insert_fields if keys is None or field in keys])})'
+    sql = f'INSERT {ignore_keyword(insert_wrapper) if duplicated_key_ignore else ""} INTO {insert_wrapper.table} ({",".join([field for field in insert_wrapper.insert_fields if keys is None or field in keys])}) VALUES ({",".join(["?" for field in insert_wrapper.insert_fields if keys is None or field in keys])})'
 
     if duplicated_key_update:
         sql += f' ON DUPLICATE KEY UPDATE {",".join([f"{field}=?" for field in insert_wrapper.insert_fields])}'
@@ -108,8 +165,6 @@ def build_insert_iterator(insert_wrapper, data_list, duplicated_key_update=False
                 args = tuple([data[field] for field in insert_wrapper.insert_fields if field in keys])
             else:
                 args = tuple([getattr(data, field) for field in insert_wrapper.insert_fields])
-            logger.debug(f'#### args: {args}')
             callback(sql, args)
 
-    logger.debug(f'#### sql: {sql}')
     return data_iterator
@@ -1,27 +1,33 @@
-from typing import Any, Tuple, List
+import csv
+import itertools
+from typing import Any, Tuple, List, Iterator, Dict, Iterable
 
 from loguru import logger
+from seal.context.sql_stats import profile, record_rows, waiting
 from seal.model.result import Result, Results
 from seal.db.protocol.data_source_protocol import IDataSource
+from seal.db.slow_query import SlowQueryLog
+from seal.db.trace import tracer
 
 
 class SqliteExecutor:
 
-    def __init__(self, data_source: IDataSource):
+    def __init__(self, data_source: IDataSource, slow_query_log: SlowQueryLog | None = None):
         self.data_source = data_source
+        self.slow_query_log = slow_query_log
 
     def find(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Result:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
         try:
-            result = cursor.execute(sql, args)
-            if result is None:
-                return Result.empty()
-
-            row = cursor.fetchone()
+            with profile(sql, args, self.slow_query_log) as p:
+                cursor.execute(sql, args)
+                row = cursor.fetchone()
+                p.rows = 0 if row is None else 1
             if row is None:
                 return Result.empty()
 
@@ -34,21 +40,24 @@ class SqliteExecutor:
             connection.close()
 
     def find_list(self, sql: str, args: Tuple[Any, ...], bean_type: Any) -> Results:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
+        # plain tuples, the beans are built positionally
+        cursor.row_factory = None
         try:
-            result = cursor.execute(sql, args)
-            if result is None:
-                return Results.empty()
-
-            rows = cursor.fetchall()
+            with profile(sql, args, self.slow_query_log) as p:
+                cursor.execute(sql, args)
+                rows = cursor.fetchall()
+                p.rows = len(rows)
             if rows is None:
                 return Results.empty()
 
-            return Results(rows=rows, bean_type=bean_type)
+            return Results(rows=rows, bean_type=bean_type,
+                           columns=tuple([description[0] for description in cursor.description]))
         except Exception as e:
             logger.exception(e)
             raise e
@@ -56,18 +65,41 @@ class SqliteExecutor:
             cursor.close()
             connection.close()
 
-    def count(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+    def find_iter(self, sql: str, args: Tuple[Any, ...], batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
         try:
-            result = cursor.execute(sql, args)
-            if result is None:
-                return None
+            with profile(sql, args, self.slow_query_log):
+                cursor.execute(sql, args)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                record_rows(len(rows))
+                yield from rows
+        except Exception as e:
+            logger.exception(e)
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
+    def count(self, sql: str, args: Tuple[Any, ...]) -> int | None:
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-            row = cursor.fetchone()
+        with waiting():
+            connection = self.data_source.get_connection()
+        cursor = connection.cursor()
+        try:
+            with profile(sql, args, self.slow_query_log) as p:
+                cursor.execute(sql, args)
+                row = cursor.fetchone()
+                p.rows = 0 if row is None else 1
             if row is None:
                 return None
 
@@ -79,14 +111,21 @@ class SqliteExecutor:
             cursor.close()
             connection.close()
 
+    # noinspection PyMethodMayBeStatic
+    def estimate_count(self, sql: str, args: Tuple[Any, ...], table: str) -> int | None:
+        # sqlite keeps no row estimate worth the name, callers fall back to an exact count
+        return None
+
     def update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
         try:
-            result = cursor.execute(sql, args)
+            with profile(sql, args, self.slow_query_log):
+                result = cursor.execute(sql, args)
             connection.commit()
             if result is None:
                 return None
@@ -99,13 +138,15 @@ class SqliteExecutor:
             connection.close()
 
     def insert(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
         try:
-            result = cursor.execute(sql, args)
+            with profile(sql, args, self.slow_query_log):
+                result = cursor.execute(sql, args)
             connection.commit()
             if result is None:
                 return None
@@ -117,14 +158,16 @@ class SqliteExecutor:
             cursor.close()
             connection.close()
 
-    def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]]) -> int | None:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+    def insert_bulk(self, sql: str, args: List[Tuple[Any, ...]], batch_size: int | None = None) -> int | None:
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
         try:
-            result = cursor.executemany(sql, args)
+            with profile(sql, args, self.slow_query_log):
+                result = cursor.executemany(sql, args)
             connection.commit()
             if result is None:
                 return None
@@ -136,6 +179,46 @@ class SqliteExecutor:
             cursor.close()
             connection.close()
 
+    def load(self, table: str, columns: List[str], rows: Iterable[Tuple[Any, ...]] | None = None,
+             file_path: str | None = None, constants: Dict[str, Any] | None = None,
+             fields_terminated_by=',', enclosed_by='"', ignore_lines=0, **options) -> Dict[str, Any]:
+        """
+        no LOAD DATA in sqlite, rows (or the csv file) go through executemany in a single transaction
+        """
+        constants = constants or {}
+        columns = list(columns) + list(constants.keys())
+        sql = f'INSERT INTO {table} ({",".join(columns)}) VALUES ({",".join(["?" for _ in columns])})'
+        if tracer.enabled:
+            tracer.statement(sql)
+
+        with waiting():
+            connection = self.data_source.get_connection()
+        cursor = connection.cursor()
+        f = None
+        try:
+            connection.begin()
+            if rows is None:
+                f = open(file_path, 'r', encoding='utf-8', newline='')
+                reader = csv.reader(f, delimiter=fields_terminated_by, quotechar=enclosed_by)
+                rows = ([None if value == '\\N' else value for value in row]
+                        for row in itertools.islice(reader, ignore_lines, None))
+            if len(constants) > 0:
+                rows = (tuple(row) + tuple(constants.values()) for row in rows)
+
+            with profile(sql, None, self.slow_query_log):
+                cursor.executemany(sql, rows)
+            connection.commit()
+            return {'rows': cursor.rowcount, 'warnings': []}
+        except Exception as e:
+            logger.exception(e)
+            connection.rollback()
+            raise e
+        finally:
+            if f is not None:
+                f.close()
+            cursor.close()
+            connection.close()
+
     # def insert_interator(self, data_iterator):
     #     connection = self.data_source.get_connection()
     #     cursor = connection.cursor()
@@ -151,17 +234,17 @@ class SqliteExecutor:
     #         connection.close()
 
     def custom_query(self, sql: str, args: Tuple[Any, ...]) -> Results:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
         try:
-            result = cursor.execute(sql, args)
-            if result is None:
-                return Results.empty()
-
-            rows = cursor.fetchall()
+            with profile(sql, args, self.slow_query_log) as p:
+                cursor.execute(sql, args)
+                rows = cursor.fetchall()
+                p.rows = len(rows)
             if rows is None:
                 return Results.empty()
 
@@ -174,13 +257,15 @@ class SqliteExecutor:
             connection.close()
 
     def custom_update(self, sql: str, args: Tuple[Any, ...]) -> int | None:
-        logger.debug(f'#### sql: {sql}')
-        logger.debug(f'#### args: {args}')
+        if tracer.enabled:
+            tracer.statement(sql, args)
 
-        connection = self.data_source.get_connection()
+        with waiting():
+            connection = self.data_source.get_connection()
         cursor = connection.cursor()
         try:
-            result = cursor.execute(sql, args)
+            with profile(sql, args, self.slow_query_log):
+                result = cursor.execute(sql, args)
             connection.commit()
             if result is None:
                 return None
@@ -1,8 +1,9 @@
 import sqlite3
 from sqlite3 import Connection
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from seal.db.protocol import IExecutor, IDatabaseConnection
+from seal.db.slow_query import slow_query_log
 from .executor import SqliteExecutor
 from .sqlite_connection import SqliteConnection
 from .table_info import TableField, TableInfo
@@ -19,7 +20,7 @@ class SqliteDataSource:
     def __init__(self, name: str, conf: Dict[str, Any]):
         self.name = name
         self.src = conf['src']
-        self.executor: IExecutor = SqliteExecutor(self)
+        self.executor: IExecutor = SqliteExecutor(self, slow_query_log=slow_query_log(self, conf, 'EXPLAIN QUERY PLAN '))
 
     def get_name(self) -> str:
         return self.name
@@ -31,8 +32,9 @@ class SqliteDataSource:
     def get_executor(self) -> IExecutor:
         return self.executor
 
-    def get_connection(self) -> IDatabaseConnection:
-        conn: Connection = sqlite3.connect(self.src)
+    def get_connection(self, read_only: bool = False) -> IDatabaseConnection:
+        # a connection is used by one caller at a time, but a streamed cursor may move between worker threads
+        conn: Connection = sqlite3.connect(self.src, check_same_thread=False)
         conn.row_factory = dict_factory
         sqlite_connection: SqliteConnection = SqliteConnection(conn)
         return sqlite_connection
@@ -63,5 +65,29 @@ class SqliteDataSource:
             c.close()
             conn.close()
 
+    def load_columns(self, database: str) -> Dict[str, List[List[Any]]]:
+        """
+        columns of every table in one query, each column as [cid, name, type, notnull, dflt_value, pk]
+        like PRAGMA table_info
+        """
+        conn = self.get_connection()
+        c = conn.cursor()
+        try:
+            c.execute('select m.name as t, p.cid, p.name, p.type, p."notnull" as nn, p.dflt_value, p.pk '
+                      'from sqlite_master m join pragma_table_info(m.name) p '
+                      "where m.type = 'table' and m.name not like 'sqlite_%' order by m.name, p.cid")
+            tables = {}
+            for row in c.fetchall():
+                tables.setdefault(row['t'], []).append([row['cid'], row['name'], row['type'], row['nn'],
+                                                        row['dflt_value'], row['pk']])
+            return tables
+        finally:
+            c.close()
+            conn.close()
+
+    # noinspection PyMethodMayBeStatic
+    def parse_structure(self, table: str, columns: List[List[Any]]) -> Any:
+        return TableInfo(table=table, table_fields=[TableField(*column) for column in columns]).parse_model()
+
     def ping(self, seconds):
         pass
@@ -1,6 +1,7 @@
-from dataclasses import make_dataclass, field
 from typing import Any
 
+from seal.model.entity import build_model
+
 
 class TableField:
 
@@ -22,7 +23,23 @@ class TableInfo:
 
     def parse_model(self):
         if self.model is None:
-            self.model = make_dataclass(self.table,
-                                        [(table_field.name, Any, field(default=None)) for table_field in
-                                         self.table_fields])
+            self.model = build_model(self.table,
+                                     [(table_field.name, python_type(table_field.type_)) for table_field in
+                                      self.table_fields])
         return self.model
+
+
+def python_type(column_type: str) -> Any:
+    """
+    sqlite type affinity rules, NUMERIC affinity may hold any of int / float / str so it stays Any
+    """
+    column_type = column_type.upper()
+    if 'INT' in column_type:
+        return int
+    if 'CHAR' in column_type or 'CLOB' in column_type or 'TEXT' in column_type:
+        return str
+    if 'BLOB' in column_type:
+        return bytes
+    if 'REAL' in column_type or 'FLOA' in column_type or 'DOUB' in column_type:
+        return float
+    return Any
@@ -1,16 +1,20 @@
+import time
 from typing import Any, Dict
 
+from loguru import logger
+
+from .schema_cache import SchemaCache
+
 
 class Structures:
     def __init__(self):
         self.structure_dict: Dict[str, Dict[str, Any]] = {}
+        self.schema_cache: SchemaCache | None = None
 
     def register(self, data_source: str, database: str | None, table: str, structure: Any):
         if database is None:
             database = ''
-        if f'{data_source}.{database}' not in self.structure_dict:
-            self.structure_dict[f'{data_source}.{database}'] = {}
-        self.structure_dict[f'{data_source}.{database}'][table] = structure
+        self.structure_dict.setdefault(f'{data_source}.{database}', {})[table] = structure
 
     def get(self, data_source: str, database: str | None, table: str) -> Any:
         if database is None:
@@ -21,5 +25,68 @@ class Structures:
             return None
         return self.structure_dict[f'{data_source}.{database}'][table]
 
+    def load(self, data_source, database: str | None, table: str) -> Any:
+        structure = self.get(data_source.get_name(), database or data_source.get_default_database(), table)
+        if structure is None:
+            structure = data_source.load_structure(database, table)
+            self.register(data_source.get_name(), database or data_source.get_default_database(), table, structure)
+        return structure
+
+    async def load_async(self, data_source, database: str | None, table: str) -> Any:
+        structure = self.get(data_source.get_name(), database or data_source.get_default_database(), table)
+        if structure is None:
+            structure = await data_source.load_structure(database, table)
+            self.register(data_source.get_name(), database or data_source.get_default_database(), table, structure)
+        return structure
+
+    def preload(self, data_source, database: str | None = None) -> int:
+        """
+        register every table of the database at once: from the schema cache if it holds a current copy,
+        otherwise from a single metadata query, which then refreshes the schema cache. returns the table count.
+        """
+        start_time = time.perf_counter()
+        database = database or data_source.get_default_database()
+        source = 'schema cache'
+        tables = self.schema_cache.read(data_source.get_name(), database) if self.schema_cache else None
+        if tables is None:
+            source = 'database'
+            tables = data_source.load_columns(database)
+            if self.schema_cache is not None:
+                self.schema_cache.write(data_source.get_name(), database, tables)
+
+        for table, columns in tables.items():
+            self.register(data_source.get_name(), database, table, data_source.parse_structure(table, columns))
+        logger.info(f'preload {len(tables)} tables of {data_source.get_name()}.{database} from {source} '
+                    f'in {time.perf_counter() - start_time:.3f}s')
+        return len(tables)
+
+    def invalidate(self, data_source: str, database: str | None = None, table: str | None = None):
+        """
+        forget structures, the next load reads them again. the schema cache file of the database is dropped too.
+        without a database every database of the data source is forgotten.
+        """
+        for key in list(self.structure_dict.keys()):
+            name, _, key_database = key.partition('.')
+            if name != data_source or (database is not None and key_database != database):
+                continue
+            if table is None:
+                del self.structure_dict[key]
+            else:
+                self.structure_dict[key].pop(table, None)
+            if self.schema_cache is not None and database is None:
+                self.schema_cache.remove(name, key_database)
+        if self.schema_cache is not None and database is not None:
+            self.schema_cache.remove(data_source, database)
+
+    def refresh(self, data_source, database: str | None = None, table: str | None = None) -> Any:
+        """
+        reload after a schema change: one table, or the whole database (returns the table count then)
+        """
+        database = database or data_source.get_default_database()
+        self.invalidate(data_source.get_name(), database or '', table)
+        if table is not None:
+            return self.load(data_source, database, table)
+        return self.preload(data_source, database)
+
 
 structures = Structures()
@@ -0,0 +1,184 @@
+import atexit
+import os
+import queue
+import random
+import reprlib
+import sys
+import threading
+from datetime import datetime
+from typing import Any
+
+from loguru import logger
+
+from ..config import configurator
+
+
+class SqlTracer:
+    """
+    statement tracing. call sites guard on the enabled attribute, so a disabled tracer costs one attribute read:
+        if tracer.enabled:
+            tracer.statement(sql, args)
+    statement returns whether the statement was sampled in, its events are traced only then:
+        traced = tracer.enabled and tracer.statement(sql, args)
+        ...
+        if traced:
+            tracer.event('#### row_affected: {}', row_affected)
+    enabled, statements are sampled with sample_rate and their args rendered through a bounded reprlib:
+    a bulk insert of a million rows shows its first max_items rows, strings are cut at max_length.
+    without seal.trace.path the records go through loguru, formatted lazily (not at all if no sink takes the level).
+    with it they go to a TraceSink: the caller only slices the args and puts them on a bounded queue,
+    rendering and writing happen in the sink's thread.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.level = 'DEBUG'
+        self.max_items = 20
+        self.repr = reprlib.Repr()
+        self._logger = logger.bind(sql_trace=True)
+        self._sink: TraceSink | None = None
+
+    def configure(self, **overrides):
+        """
+        seal.trace.{enabled, sample_rate, level, max_length, max_items, path, queue_size, max_bytes},
+        overrides win over the config
+        """
+        def conf(key, default):
+            if key in overrides:
+                return overrides[key]
+            return configurator.get_conf_default('seal', 'trace', key, default=default)
+
+        sample_rate = float(conf('sample_rate', 1.0))
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f'sample_rate must be between 0 and 1: {sample_rate}')
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.level = conf('level', 'DEBUG')
+        self.max_items = conf('max_items', 20)
+        self.repr = bounded_repr(conf('max_length', 200), self.max_items)
+
+        if self._sink is not None:
+            self._sink.stop()
+            self._sink = None
+        path = conf('path', None)
+        if path:
+            self._sink = TraceSink(path, self.level, self.repr,
+                                   conf('queue_size', 10000), conf('max_bytes', 100 * 1024 * 1024))
+        self.enabled = bool(conf('enabled', False)) and sample_rate > 0
+
+    def statement(self, sql: str, args: Any = None) -> bool:
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        if self._sink is None:
+            self._logger.opt(lazy=True, depth=1).log(self.level, '#### sql: {} | args: {}',
+                                                     lambda: sql, lambda: self.repr.repr(args))
+            return True
+        size = None
+        if isinstance(args, (list, tuple)) and len(args) > self.max_items:
+            # the queue must not keep a whole bulk insert alive
+            size = len(args)
+            args = args[:self.max_items]
+        self._sink.put(sys._getframe(1), '#### sql: ', sql, args, size)
+        return True
+
+    def event(self, message: str, *args: Any):
+        """
+        a follow-up of a statement (rows affected...), not sampled again: callers skip it when statement returned False
+        """
+        if self._sink is None:
+            self._logger.opt(depth=1).log(self.level, message, *args)
+            return
+        self._sink.put(sys._getframe(1), message.format(*args))
+
+    def dropped(self) -> int:
+        """
+        records discarded because the trace sink's queue was full
+        """
+        return self._sink.dropped if self._sink is not None else 0
+
+
+class TraceSink:
+    """
+    trace file written by a daemon thread. the queue is bounded: when the writer falls behind, records are dropped
+    and counted instead of slowing the statements down. past max_bytes the file is moved to path.1.
+    """
+
+    def __init__(self, path: str, level: str, args_repr: reprlib.Repr, queue_size: int = 10000,
+                 max_bytes: int = 100 * 1024 * 1024):
+        self.path = path
+        self.level = level
+        self.args_repr = args_repr
+        self.max_bytes = max_bytes
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self.run, name='seal-trace', daemon=True)
+        self._thread.start()
+        # what is still queued at exit gets written
+        atexit.register(self.stop)
+
+    def put(self, frame, message: str, sql: str | None = None, args: Any = None, size: int | None = None):
+        if self._stopped:
+            return
+        try:
+            self.queue.put_nowait((datetime.now(), frame.f_globals.get('__name__'), frame.f_code.co_name,
+                                   frame.f_lineno, message, sql, args, size))
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self, timeout: float = 5.0):
+        if self._stopped:
+            return
+        self._stopped = True
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning('trace sink {} did not take the stop signal', self.path)
+            return
+        self._thread.join(timeout)
+
+    def run(self):
+        f = open(self.path, 'a', encoding='utf-8')
+        try:
+            while True:
+                # whatever piled up is written in one go
+                items = [self.queue.get()]
+                while len(items) < 1000 and not self.queue.empty():
+                    items.append(self.queue.get_nowait())
+                # a put racing stop can land behind the sentinel, what comes after it is dropped
+                stop = None in items
+                if stop:
+                    items = items[:items.index(None)]
+                f.write(''.join([self.format(item) for item in items]))
+                f.flush()
+                if stop:
+                    break
+                if f.tell() > self.max_bytes:
+                    f.close()
+                    os.replace(self.path, f'{self.path}.1')
+                    f = open(self.path, 'a', encoding='utf-8')
+        finally:
+            f.close()
+
+    def format(self, item) -> str:
+        time, name, function, line, message, sql, args, size = item
+        if sql is not None:
+            message = f'{message}{sql} | args: {self.args_repr.repr(args)}'
+            if size is not None:
+                message += f' ({size} items)'
+        return (f'{time:%Y-%m-%d %H:%M:%S}.{time.microsecond // 1000:03d} | {self.level: <8} | '
+                f'{name}:{function}:{line} - {message}\n')
+
+
+def bounded_repr(max_length: int, max_items: int) -> reprlib.Repr:
+    r = reprlib.Repr()
+    r.maxstring = max_length
+    r.maxother = max_length
+    r.maxlong = max_length
+    r.maxlist = r.maxtuple = r.maxdict = r.maxset = r.maxfrozenset = r.maxdeque = r.maxarray = max_items
+    r.maxlevel = 3
+    return r
+
+
+tracer = SqlTracer()
@@ -11,23 +11,42 @@ class SqlContext:
     def __init__(self):
         self._tx: IDatabaseConnection | None = None
         self._tx_id = None
+        self._completion_callbacks = []
 
     def begin(self, ds: IDataSource):
         self._tx_id = uuid.uuid4()
         self._tx = ds.get_connection()
         self._tx.begin()
 
-        logger.debug(f'begin transaction: {self._tx_id}')
+        logger.debug('begin transaction: {}', self._tx_id)
 
     def commit(self):
         self._tx.commit()
-        logger.debug(f'commit transaction: {self._tx_id}')
+        logger.debug('commit transaction: {}', self._tx_id)
         self._tx.close()
+        self._tx = None
+        self.complete()
 
     def rollback(self):
         self._tx.rollback()
-        logger.debug(f'rollback transaction: {self._tx_id}')
+        logger.debug('rollback transaction: {}', self._tx_id)
         self._tx.close()
+        self._tx = None
+        self.complete()
+
+    def after_completion(self, callback):
+        """
+        run callback once the current transaction has been committed or rolled back
+        """
+        self._completion_callbacks.append(callback)
+
+    def complete(self):
+        callbacks, self._completion_callbacks = self._completion_callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.exception(e)
 
     def tx(self):
         return self._tx
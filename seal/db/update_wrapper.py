@@ -1,8 +1,9 @@
 import datetime
 from dataclasses import fields
 
-from . import structures
+from .structures import structures
 from .protocol import IDataSource
+from .query_cache import query_cache, table_tag
 from .sql_builder import build_update, build_delete
 from .wrapper import Wrapper
 from ..types import Column
@@ -35,15 +36,10 @@ class UpdateWrapper(Wrapper):
         self.updated_at_field: any = updated_at_field
         self.update_fields: dict = {}
 
-        self.model = structures.get(data_source=self.data_source.get_name(),
-                                    database=database or data_source.get_default_database(),
-                                    table=table)
-        if self.model is None:
-            self.model = self.data_source.load_structure(database, table)
-            structures.register(data_source=self.data_source.get_name(),
-                                database=database or data_source.get_default_database(),
-                                table=table,
-                                structure=self.model)
+        self.model = self.resolve_structure(database, table)
+
+    def resolve_structure(self, database: str | None, table: str) -> any:
+        return structures.load(self.data_source, database, table)
 
     def set(self, field: Column, value: any) -> 'UpdateWrapper':
         self.update_fields[field] = value
@@ -68,7 +64,9 @@ class UpdateWrapper(Wrapper):
 
         self.handle_public_fields(**options)
         sql, args = build_update(self)
-        return self.data_source.get_executor().update(sql, args)
+        rows = self.data_source.get_executor().update(sql, args)
+        self.invalidate_cache()
+        return rows
 
     def delete(self, **options):
         if len(self.condition_tree.conditions) == 0:
@@ -81,7 +79,12 @@ class UpdateWrapper(Wrapper):
             return self.update(**options)
         else:
             sql, args = build_delete(self)
-            return self.data_source.get_executor().update(sql, args)
+            rows = self.data_source.get_executor().update(sql, args)
+            self.invalidate_cache()
+            return rows
+
+    def invalidate_cache(self):
+        query_cache.invalidate(table_tag(self.data_source, self.table))
 
     def handle_update_fields(self, **options) -> 'UpdateWrapper':
         if self.updated_at_field is not None:
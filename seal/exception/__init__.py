@@ -1,4 +1,5 @@
 from .business_exception import BusinessException
+from .pool_exhausted_exception import PoolExhaustedException
 from .unsupported_exception import UnsupportedException
 
-__all__ = ['BusinessException', 'UnsupportedException']
+__all__ = ['BusinessException', 'PoolExhaustedException', 'UnsupportedException']
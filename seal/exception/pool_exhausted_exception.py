@@ -0,0 +1,8 @@
+class PoolExhaustedException(Exception):
+
+    def __init__(self, code=1, message='No available connection'):
+        self.code = code
+        self.message = message
+
+    def __str__(self):
+        return f"{self.code} - {self.message}"
@@ -0,0 +1,17 @@
+from dataclasses import make_dataclass, field
+from typing import Any, List, Tuple
+
+from ..config import configurator
+
+
+def build_model(name: str, columns: List[Tuple[str, Any]], frozen: bool | None = None) -> Any:
+    """
+    entity class of a table: a slotted dataclass, one optional typed field per column in table order.
+    frozen defaults to the seal.model.frozen config, frozen beans can't get tenant fields filled in on insert.
+    """
+    if frozen is None:
+        frozen = configurator.get_conf_default('seal', 'model', 'frozen', default=False)
+    return make_dataclass(name,
+                          [(column, python_type | None, field(default=None)) for column, python_type in columns],
+                          slots=True,
+                          frozen=frozen)
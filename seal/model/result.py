@@ -1,4 +1,11 @@
-from typing import Any, Dict, List
+from array import array
+from dataclasses import fields
+from functools import lru_cache
+from itertools import starmap
+from operator import itemgetter
+from typing import Any, Dict, List, Tuple
+
+from seal.context.sql_stats import materializing
 
 
 class Result:
@@ -25,11 +32,20 @@ class Result:
             return self.row
         return None
 
+    def copy(self) -> 'Result':
+        return Result(dict(self.row) if self.row is not None else None, self.bean_type)
+
 
 class Results:
-    def __init__(self, rows: List[Dict[str, Any]] = None, bean_type=None):
+    """
+    rows are dicts, or tuples when columns (the column names in cursor order) is given
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]] | List[Tuple[Any, ...]] = None, bean_type=None,
+                 columns: Tuple[str, ...] | None = None):
         self.rows = rows
         self.bean_type = bean_type
+        self.columns = columns
 
     @staticmethod
     def empty() -> 'Results':
@@ -42,10 +58,80 @@ class Results:
         if self.rows is not None:
             if self.bean_type is None:
                 raise Exception('no type specified')
-            return [self.bean_type(**row) for row in self.rows]
+            with materializing():
+                if self.columns is None:
+                    return [self.bean_type(**row) for row in self.rows]
+                if positional(self.bean_type, self.columns):
+                    return list(starmap(self.bean_type, self.rows))
+                return [self.bean_type(**dict(zip(self.columns, row))) for row in self.rows]
         return []
 
     def as_dict(self) -> List[Dict]:
         if self.rows is not None:
+            if self.columns is not None:
+                with materializing():
+                    return [dict(zip(self.columns, row)) for row in self.rows]
             return self.rows
         return []
+
+    def to_columns(self, numpy: bool = False) -> Dict[str, Any]:
+        """
+        column name -> values, no per-row dict or bean is built. int / float columns without NULL become
+        array.array ('q' / 'd'), or numpy arrays with numpy=True, every other column stays a list.
+        """
+        if self.rows is None or len(self.rows) == 0:
+            return {column: [] for column in self.columns or ()}
+        with materializing():
+            return self.build_columns(numpy)
+
+    def build_columns(self, numpy: bool) -> Dict[str, Any]:
+        columns, rows = self.columns, self.rows
+        if columns is None:
+            columns = tuple(rows[0].keys())
+            rows = [tuple(row.values()) for row in rows]
+
+        if numpy:
+            try:
+                import numpy as np
+            except ImportError:
+                raise ImportError('numpy is required by to_columns(numpy=True): pip install numpy')
+            return {column: np.array(values) if numeric_typecode(values) else np.array(values, dtype=object)
+                    for column, values in zip(columns, transpose(rows, len(columns)))}
+
+        result = {}
+        for column, values in zip(columns, transpose(rows, len(columns))):
+            typecode = numeric_typecode(values)
+            try:
+                result[column] = array(typecode, values) if typecode else list(values)
+            except OverflowError:
+                # e.g. bigint unsigned beyond int64
+                result[column] = list(values)
+        return result
+
+    def copy(self) -> 'Results':
+        if self.rows is None or self.columns is not None:
+            return Results(self.rows if self.rows is None else list(self.rows), self.bean_type, self.columns)
+        return Results([dict(row) for row in self.rows], self.bean_type)
+
+
+@lru_cache(maxsize=1024)
+def positional(bean_type, columns: Tuple[str, ...]) -> bool:
+    """
+    whether tuples in columns order can be passed straight to the constructor
+    """
+    names = tuple([f.name for f in fields(bean_type)])
+    return names[:len(columns)] == columns
+
+
+def transpose(rows: List[Tuple[Any, ...]], width: int) -> List[List[Any]]:
+    # one C level pass per column, zip(*rows) with a huge argument list is several times slower
+    return [list(map(itemgetter(i), rows)) for i in range(width)]
+
+
+def numeric_typecode(values: List[Any]) -> str | None:
+    types = set(map(type, values))
+    if types <= {int, bool}:
+        return 'q'
+    if types <= {int, float}:
+        return 'd'
+    return None
@@ -0,0 +1,44 @@
+import json
+from typing import Any
+
+from pydantic_core import to_jsonable_python
+from starlette.responses import Response
+
+from ..config import configurator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    json bytes of dicts, lists, beans (dataclasses), datetimes... without pydantic validation.
+    types json can't encode natively (Decimal, timedelta, bytes, pydantic models...) are converted the way
+    pydantic serializes them, so the output matches the ResponseModel path (utc datetimes end in Z there too).
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=to_jsonable_python,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z)
+    return json.dumps(content, default=to_jsonable_python, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def fast_response_enabled(fast: bool | None = None) -> bool:
+    if fast is not None:
+        return fast
+    return configurator.get_conf_default('seal', 'response', 'fast', default=False)
+
+
+class FastJSONResponse(Response):
+    """
+    the {code, message, data} envelope rendered straight from python objects, orjson when it is installed
+    """
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+    @staticmethod
+    def envelope(data: Any = None, code: int = 0, message: str = 'success') -> 'FastJSONResponse':
+        return FastJSONResponse({'code': code, 'message': message, 'data': data})
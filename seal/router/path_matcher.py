@@ -0,0 +1,74 @@
+import re
+import threading
+from typing import List
+
+from ..config import configurator
+
+
+def ant_to_regex(pattern: str) -> str:
+    """
+    ant style path pattern, matched against the whole path:
+    ? one character, * any characters within a segment, ** any number of segments (including none)
+    e.g. /test/** matches /test, /test/ and /test/a/b
+    """
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('/**', i) and (i + 3 == len(pattern) or pattern[i + 3] == '/'):
+            regex += '(?:/.*)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+def exclude_to_regex(pattern: str) -> str:
+    """
+    a pattern without wildcards keeps its old prefix meaning: /static excludes /static and everything below it,
+    the same as /static/**
+    """
+    if '*' not in pattern and '?' not in pattern:
+        pattern = pattern.rstrip('/') + '/**'
+    return ant_to_regex(pattern)
+
+
+def compile_patterns(patterns: List[str]) -> re.Pattern | None:
+    """
+    one alternation for all patterns, a path is tested with a single fullmatch
+    """
+    if len(patterns) == 0:
+        return None
+    return re.compile('|'.join([f'(?:{exclude_to_regex(pattern)})' for pattern in patterns]))
+
+
+class ExcludeMatcher:
+    """
+    seal.authorization.excludes compiled once, and again whenever the config is reloaded
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._regex: re.Pattern | None = None
+
+    def matches(self, path: str) -> bool:
+        if self._version != configurator.version:
+            with self._lock:
+                if self._version != configurator.version:
+                    excludes = configurator.get_conf_default('seal', 'authorization', 'excludes', default=[])
+                    self._regex = compile_patterns(excludes or [])
+                    self._version = configurator.version
+        return self._regex is not None and self._regex.fullmatch(path) is not None
+
+
+exclude_matcher = ExcludeMatcher()
@@ -1,32 +1,31 @@
 import asyncio
-import re
+import inspect
 import time
 from functools import wraps
 
-import jwt
 from fastapi import FastAPI, Request, Response, HTTPException, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from loguru import logger
 from starlette.middleware.cors import CORSMiddleware
 
 from ..config import configurator
-from ..context import web_context
+from ..context import web_context, WebContext
+from ..context.sql_stats import SqlStats
+from ..db.offload import offload_enabled, run_sync
 from ..exception import BusinessException
 from ..model import Response as ResponseModel
+from .fast_response import FastJSONResponse, fast_response_enabled
+from .path_matcher import exclude_matcher
+from .stream import check_stream, stream_response
+from .token_cache import token_cache
 
 
 async def verify_token(request: Request = Request):
     if request.method == 'OPTIONS':
         return None
 
-    ignore = False
-    path = request.url.path
-    urls = configurator.get_config('seal', 'authorization', 'excludes')
-    for url in urls:
-        # * -> [a-zA-Z0-9_\-]*, ** -> .*
-        url = url.replace('*', '[a-zA-Z0-9_\-]*').replace('**', '.*')
-        if re.match(url, path):
-            ignore = True
-            break
+    ignore = exclude_matcher.matches(request.url.path)
 
     try:
         token = request.headers.get('Authorization', None)
@@ -35,9 +34,7 @@ async def verify_token(request: Request = Request):
                 return None
             raise HTTPException(status_code=401, detail="Token is required")
 
-        payload = jwt.decode(token,
-                             configurator.get_config('seal', 'authorization', 'jwt_key'),
-                             algorithms=["HS256"])
+        payload = token_cache.verify(token)
         web_context.get().set_uid(payload['uid'])
     except Exception as e:
         if ignore:
@@ -51,9 +48,20 @@ app = FastAPI(dependencies=[Depends(verify_token)])
 @app.middleware("http")
 async def calc_time(request: Request, call_next):
     start_time = time.time()
+    # every request gets its own context, the ContextVar default is shared by all of them
+    stats = SqlStats() if configurator.get_conf_default('seal', 'profiling', 'enabled', default=True) else None
+    web_context.set(WebContext(sql_stats=stats))
     response = await call_next(request)
     process_time = time.time() - start_time
-    logger.info(f'{request.method} {request.url.path} {response.status_code} {process_time}')
+    if stats is None:
+        logger.info(f'{request.method} {request.url.path} {response.status_code} {process_time}')
+    else:
+        # streamed bodies are still being produced here, their sql is only partly counted
+        logger.info(f'{request.method} {request.url.path} {response.status_code} {process_time} {stats.summary()}')
+        response.headers['Server-Timing'] = stats.server_timing()
+        threshold = configurator.get_conf_default('seal', 'profiling', 'n_plus_one', default=10)
+        for sql, count in stats.repeated(threshold):
+            logger.warning(f'possible N+1 in {request.method} {request.url.path}: {count} x {sql}')
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
@@ -73,56 +81,117 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return Response(status_code=exc.status_code, content=exc.detail)
 
 
-def response_body(func, **kwargs):
+def response_body(func, offload: bool | None = None, stream: str | None = None, fast: bool | None = None, **kwargs):
+    is_coroutine = asyncio.iscoroutinefunction(func)
+    is_async_generator = inspect.isasyncgenfunction(func)
+    if offload and (is_coroutine or is_async_generator):
+        # only sync handlers are offloaded, an async one runs on the event loop whatever the flag says
+        logger.warning(f'offload=True ignored on async handler {func.__module__}.{func.__qualname__}')
+
     @wraps(func)
     async def wrapper(*fun_args, **fun_kwargs):
         try:
-            task = asyncio.create_task(func(*fun_args, **fun_kwargs))
-            result = await task
+            if is_coroutine:
+                task = asyncio.create_task(func(*fun_args, **fun_kwargs))
+                result = await task
+            elif is_async_generator:
+                result = func(*fun_args, **fun_kwargs)
+            elif offload_enabled(offload):
+                result = await run_sync(func, *fun_args, **fun_kwargs)
+            else:
+                result = func(*fun_args, **fun_kwargs)
+            if stream is not None:
+                return stream_response(result, stream)
+            if kwargs.get('response_model') is ResponseModel and fast_response_enabled(fast):
+                # a Response is returned as is, FastAPI skips validating and re-serializing data
+                return FastJSONResponse.envelope(result)
             if 'response_model' in kwargs and type(kwargs.get('response_model')) == type(ResponseModel):
                 return ResponseModel.build(result).success()
             return result
         except BusinessException as e:
             logger.exception(e)
-            return ResponseModel.build().error(message=e.message, code=e.code)
+            return error_body(stream, fast, message=e.message, code=e.code)
         except Exception as e:
             logger.exception(e)
-            return ResponseModel.build().error(message=str(e))
+            return error_body(stream, fast, message=str(e))
 
     return wrapper
 
 
-def get(path: str, **kwargs):
+def error_body(stream: str | None, fast: bool | None, **kwargs):
+    body = ResponseModel.build().error(**kwargs)
+    if stream is None and fast_response_enabled(fast):
+        return FastJSONResponse(body.model_dump())
+    if stream is not None:
+        # nothing has been streamed yet, a stream route has no response model to serialize the envelope
+        return JSONResponse(content=jsonable_encoder(body))
+    return body
+
+
+def route_kwargs(stream: str | None, kwargs):
+    check_stream(stream)
+    if stream is not None:
+        kwargs['response_model'] = None
+    elif 'response_model' not in kwargs and 'response_class' not in kwargs:
+        kwargs['response_model'] = ResponseModel
+    return kwargs
+
+
+def get(path: str, offload: bool | None = None, stream: str | None = None, fast: bool | None = None, **kwargs):
+    """
+    offload: run a sync handler on the offload executor, defaults to seal.offload.enabled. async handlers are never
+    offloaded, offload=True on one is ignored with a warning
+    stream: 'ndjson' or 'csv', the handler returns an iterable / generator streamed as a chunked response
+    fast: render the Response envelope with FastJSONResponse, defaults to seal.response.fast
+    """
+
     def decorator(func):
-        if 'response_model' not in kwargs and 'response_class' not in kwargs:
-            kwargs['response_model'] = ResponseModel
-        return app.get(path, **kwargs)(response_body(func, **kwargs))
+        route_kwargs(stream, kwargs)
+        return app.get(path, **kwargs)(response_body(func, offload=offload, stream=stream, fast=fast, **kwargs))
 
     return decorator
 
 
-def post(path: str, **kwargs):
+def post(path: str, offload: bool | None = None, stream: str | None = None, fast: bool | None = None, **kwargs):
+    """
+    offload: run a sync handler on the offload executor, defaults to seal.offload.enabled. async handlers are never
+    offloaded, offload=True on one is ignored with a warning
+    stream: 'ndjson' or 'csv', the handler returns an iterable / generator streamed as a chunked response
+    fast: render the Response envelope with FastJSONResponse, defaults to seal.response.fast
+    """
+
     def decorator(func):
-        if 'response_model' not in kwargs and 'response_class' not in kwargs:
-            kwargs['response_model'] = ResponseModel
-        return app.post(path, **kwargs)(response_body(func, **kwargs))
+        route_kwargs(stream, kwargs)
+        return app.post(path, **kwargs)(response_body(func, offload=offload, stream=stream, fast=fast, **kwargs))
 
     return decorator
 
 
-def delete(path: str, **kwargs):
+def delete(path: str, offload: bool | None = None, stream: str | None = None, fast: bool | None = None, **kwargs):
+    """
+    offload: run a sync handler on the offload executor, defaults to seal.offload.enabled. async handlers are never
+    offloaded, offload=True on one is ignored with a warning
+    stream: 'ndjson' or 'csv', the handler returns an iterable / generator streamed as a chunked response
+    fast: render the Response envelope with FastJSONResponse, defaults to seal.response.fast
+    """
+
     def decorator(func):
-        if 'response_model' not in kwargs and 'response_class' not in kwargs:
-            kwargs['response_model'] = ResponseModel
-        return app.delete(path, **kwargs)(response_body(func, **kwargs))
+        route_kwargs(stream, kwargs)
+        return app.delete(path, **kwargs)(response_body(func, offload=offload, stream=stream, fast=fast, **kwargs))
 
     return decorator
 
 
-def put(path: str, **kwargs):
+def put(path: str, offload: bool | None = None, stream: str | None = None, fast: bool | None = None, **kwargs):
+    """
+    offload: run a sync handler on the offload executor, defaults to seal.offload.enabled. async handlers are never
+    offloaded, offload=True on one is ignored with a warning
+    stream: 'ndjson' or 'csv', the handler returns an iterable / generator streamed as a chunked response
+    fast: render the Response envelope with FastJSONResponse, defaults to seal.response.fast
+    """
+
     def decorator(func):
-        if 'response_model' not in kwargs and 'response_class' not in kwargs:
-            kwargs['response_model'] = ResponseModel
-        return app.put(path, **kwargs)(response_body(func, **kwargs))
+        route_kwargs(stream, kwargs)
+        return app.put(path, **kwargs)(response_body(func, offload=offload, stream=stream, fast=fast, **kwargs))
 
     return decorator
@@ -0,0 +1,162 @@
+import csv
+import datetime
+import io
+import threading
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterator, List, Tuple
+
+import anyio
+from loguru import logger
+from starlette.responses import StreamingResponse
+
+from ..config import configurator
+from ..db.offload import run_sync
+from ..exception import BusinessException
+from .fast_response import dumps
+
+STREAM_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def check_stream(stream: str | None):
+    if stream is not None and stream not in STREAM_MEDIA_TYPES:
+        raise ValueError(f'unsupported stream format: {stream}')
+
+
+def stream_response(result: Any, stream: str) -> StreamingResponse:
+    """
+    chunked response of an iterable / generator / async generator, one ndjson line or csv row per item.
+    an error raised mid-stream ends the body with a trailer instead of a truncated document:
+    ndjson: {"__error__": {"code": ..., "message": ...}}
+    csv:    #error,<code>,<message>
+    """
+    return StreamingResponse(stream_chunks(result, stream), media_type=STREAM_MEDIA_TYPES[stream])
+
+
+async def stream_chunks(result: Any, stream: str) -> AsyncIterator[bytes]:
+    encoder = StreamEncoder(stream)
+    batch_size = configurator.get_conf_default('seal', 'stream', 'batch_size', default=1000)
+    source = None
+    try:
+        if hasattr(result, '__aiter__'):
+            batch = []
+            try:
+                async for item in result:
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        yield encoder.encode(batch)
+                        batch = []
+            except Exception:
+                if len(batch) > 0:
+                    yield encoder.encode(batch)
+                raise
+            if len(batch) > 0:
+                yield encoder.encode(batch)
+        else:
+            # a blocking iterator (e.g. QueryWrapper.stream) is drained and encoded on the offload executor
+            source = SyncSource(result, encoder, batch_size)
+            while True:
+                chunk = await run_sync(source.next_chunk)
+                if chunk is None:
+                    break
+                yield chunk
+    except BusinessException as e:
+        logger.exception(e)
+        yield encoder.error(e.code, e.message)
+    except Exception as e:
+        logger.exception(e)
+        yield encoder.error(-1, str(e))
+    finally:
+        # also reached when the client disconnects, the generator must give its connection back
+        with anyio.CancelScope(shield=True):
+            if source is not None:
+                await run_sync(source.close)
+            elif hasattr(result, 'aclose'):
+                await result.aclose()
+
+
+class SyncSource:
+    def __init__(self, result: Any, encoder: 'StreamEncoder', batch_size: int):
+        self.iterator: Iterator[Any] = iter(result)
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.error: Exception | None = None
+        # a step may still be running in a worker thread when close is requested
+        self.lock = threading.Lock()
+
+    def next_chunk(self) -> bytes | None:
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+            batch = []
+            try:
+                for item in self.iterator:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+            except Exception as e:
+                if len(batch) == 0:
+                    raise
+                # the rows read before the failure go out first, the error follows as the trailer
+                self.error = e
+            if len(batch) == 0:
+                return None
+            return self.encoder.encode(batch)
+
+    def close(self):
+        with self.lock:
+            if hasattr(self.iterator, 'close'):
+                self.iterator.close()
+
+
+class StreamEncoder:
+    def __init__(self, stream: str):
+        self.stream = stream
+        self.header: List[str] | None = None
+
+    def encode(self, items: List[Any]) -> bytes:
+        if self.stream == 'ndjson':
+            return b''.join([dumps(item) + b'\n' for item in items])
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        rows = [as_dict(item) for item in items]
+        if self.header is None:
+            self.header = list(rows[0].keys())
+            writer.writerow(self.header)
+        writer.writerows([[csv_value(row.get(column)) for column in self.header] for row in rows])
+        return buffer.getvalue().encode('utf-8')
+
+    def error(self, code: Any, message: str) -> bytes:
+        if self.stream == 'ndjson':
+            return dumps({'__error__': {'code': code, 'message': message}}) + b'\n'
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(['#error', code, message])
+        return buffer.getvalue().encode('utf-8')
+
+
+def as_dict(item: Any) -> dict:
+    if isinstance(item, dict):
+        return item
+    if is_dataclass(item):
+        # slotted beans have no __dict__
+        return {name: getattr(item, name) for name in field_names(type(item))}
+    if hasattr(item, 'model_dump'):
+        return item.model_dump()
+    return vars(item)
+
+
+@lru_cache(maxsize=1024)
+def field_names(bean_type) -> Tuple[str, ...]:
+    return tuple([f.name for f in fields(bean_type)])
+
+
+def csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
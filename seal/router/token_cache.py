@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import jwt
+
+from ..cache import LRUCache
+from ..config import configurator
+
+
+class TokenCache:
+    """
+    payloads of verified tokens keyed by sha256(token), a repeated token costs a dict lookup instead of an HS256 decode.
+    an entry lives until the token's exp, at most seal.authorization.token_cache.ttl seconds (default 300),
+    and is dropped when the config is reloaded (the jwt key may have changed).
+    revocation hooks, hook(payload) -> True when revoked, are consulted on every request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: LRUCache | None = None
+        self._version = None
+        self._ttl = 300
+        self._enabled = True
+        self._hooks: List[Callable[[Dict[str, Any]], bool]] = []
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'revoked': 0}
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        self.configure()
+        if not self._enabled:
+            return self.decode(token)
+
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                self._entries.remove(key)
+                self._stats['expired'] += 1
+                entry = None
+            self._stats['hits' if entry is not None else 'misses'] += 1
+
+        if entry is None:
+            payload = self.decode(token)
+            expire_at = now + self._ttl
+            if isinstance(payload.get('exp'), (int, float)):
+                expire_at = min(expire_at, payload['exp'])
+            with self._lock:
+                self._entries.set(key, (payload, expire_at))
+        else:
+            payload = entry[0]
+
+        if self._hooks and any(hook(payload) for hook in self._hooks):
+            with self._lock:
+                self._entries.remove(key)
+                self._stats['revoked'] += 1
+            raise jwt.InvalidTokenError('Token has been revoked')
+        return payload
+
+    # noinspection PyMethodMayBeStatic
+    def decode(self, token: str) -> Dict[str, Any]:
+        return jwt.decode(token, configurator.get_config('seal', 'authorization', 'jwt_key'), algorithms=["HS256"])
+
+    def configure(self):
+        if self._version == configurator.version:
+            return
+        with self._lock:
+            if self._version != configurator.version:
+                conf = configurator.get_conf_default('seal', 'authorization', 'token_cache', default={})
+                self._enabled = conf.get('enabled', True)
+                self._ttl = conf.get('ttl', 300)
+                self._entries = LRUCache(conf.get('capacity', 10000))
+                self._version = configurator.version
+
+    def add_revocation_hook(self, hook: Callable[[Dict[str, Any]], bool]):
+        self._hooks.append(hook)
+
+    def revoke(self, token: str):
+        """
+        forget the cached payload, the token itself stays valid until exp unless a revocation hook rejects it
+        """
+        with self._lock:
+            if self._entries is not None:
+                self._entries.remove(hashlib.sha256(token.encode('utf-8')).digest())
+                self._stats['revoked'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+token_cache = TokenCache()
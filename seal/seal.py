@@ -1,17 +1,25 @@
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any, Dict
 
 import jwt
 from loguru import logger
 
-from seal.db.protocol import IDataSource
+from seal.db.protocol import IDataSource, IAsyncDataSource
 from seal.model.result import Results
 from .cache import LRUCache, Cache
 from .config import configurator
 from .context import web_context, WebContext
 from .db import Wrapper, sql_context, InsertWrapper, QueryWrapper, UpdateWrapper, structures
+from .db import AsyncInsertWrapper, AsyncQueryWrapper, AsyncUpdateWrapper, QueryCache, query_cache
+from .db.offload import run_sync
+from .db.schema_cache import SchemaCache
+from .db.trace import SqlTracer, tracer
+from .db.transaction import SqlContext
 from .router import get, post, put, delete
+from .router.token_cache import TokenCache, token_cache
 
 
 class Seal:
@@ -19,6 +27,9 @@ class Seal:
     def __init__(self):
         self._initialized = False
         self.data_source_dict: Dict[str, IDataSource] = {}
+        self.async_data_source_dict: Dict[str, IAsyncDataSource] = {}
+        # data source name -> seconds spent creating it in init
+        self.startup_timings: Dict[str, float] = {}
         self._lru_cache: LRUCache = LRUCache(102400)
         self._cache = Cache()
 
@@ -32,30 +43,42 @@ class Seal:
     def init(self, config_path: str, init_loguru: bool = True, init_database: bool = True):
         configurator.load(config_path)
         self._initialized = True
+        lru_conf = configurator.get_conf_default('seal', 'lru_cache', default=None)
+        if lru_conf:
+            self._lru_cache = LRUCache(lru_conf.get('capacity', 102400), max_bytes=lru_conf.get('max_bytes'),
+                                       ttl=lru_conf.get('ttl'), shards=lru_conf.get('shards', 16))
+        reaper_interval = configurator.get_conf_default('seal', 'memory_cache', 'reaper_interval')
+        if reaper_interval:
+            self._cache.start_reaper(reaper_interval)
 
         if init_loguru:
             logger.add(self.get_config('seal', 'loguru', 'path'),
                        rotation=self.get_config('seal', 'loguru', 'rotation'),
                        retention=self.get_config('seal', 'loguru', 'retention'),
                        level=self.get_config('seal', 'loguru', 'level'))
+            slow_query_path = configurator.get_conf_default('seal', 'slow_query', 'path')
+            if slow_query_path:
+                logger.add(slow_query_path,
+                           rotation=self.get_config('seal', 'loguru', 'rotation'),
+                           retention=self.get_config('seal', 'loguru', 'retention'),
+                           filter=lambda record: record['extra'].get('slow_query', False))
+        tracer.configure()
 
         if init_database:
+            schema_cache_path = configurator.get_conf_default('seal', 'schema', 'cache_path')
+            if schema_cache_path:
+                structures.schema_cache = SchemaCache(schema_cache_path,
+                                                      configurator.get_conf_default('seal', 'schema', 'version'))
+
             data_source_config = self.get_config('seal', 'data_source')
-            for data_source_name, data_source_conf in data_source_config.items():
-                data_source = self.get_config('seal', 'data_source', data_source_name)
-                if 'mysql' == data_source.get('dialect'):
-                    from .db.mysql.mysql_data_source import MysqlDataSource
-                    mysql_ds = MysqlDataSource(name=data_source_name, conf=data_source_conf)
-                    self.data_source_dict[data_source_name] = mysql_ds
-
-                    # a new thread for keeping connections active
-                    threading.Thread(target=mysql_ds.ping, args=[data_source.get('ping')], daemon=True).start()
-
-                elif 'sqlite' == data_source.get('dialect'):
-                    from .db.sqlite.sqlite_data_source import SqliteDataSource
-                    self.data_source_dict[data_source_name] = SqliteDataSource(name=data_source_name, conf=data_source_conf)
-                else:
-                    raise ValueError(f'不支持的数据源类型: {data_source.get("dialect")}')
+            # data sources are independent, open them concurrently so the boot time is bound by the slowest one
+            workers = max(1, len(data_source_config))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='seal-init') as executor:
+                futures = {data_source_name: executor.submit(self._init_data_source, data_source_name, data_source_conf)
+                           for data_source_name, data_source_conf in data_source_config.items()}
+                for data_source_name, future in futures.items():
+                    self.startup_timings[data_source_name] = future.result()
+                    logger.info(f'init data source {data_source_name} in {self.startup_timings[data_source_name]:.3f}s')
 
             if 'default' not in self.data_source_dict:
                 raise ValueError('unknown default data source')
@@ -63,11 +86,41 @@ class Seal:
         logger.info(f'init seal with config: {config_path}')
         return self
 
+    def _init_data_source(self, data_source_name: str, data_source_conf: Dict[str, Any]) -> float:
+        start_time = time.perf_counter()
+        if 'mysql' == data_source_conf.get('dialect'):
+            from .db.mysql.mysql_data_source import MysqlDataSource
+            mysql_ds = MysqlDataSource(name=data_source_name, conf=data_source_conf)
+            self.data_source_dict[data_source_name] = mysql_ds
+
+            # a housekeeper thread evicting, validating and refilling pooled connections
+            threading.Thread(target=mysql_ds.ping, args=[data_source_conf.get('ping')], daemon=True).start()
+
+            if data_source_conf.get('async', False):
+                from .db.mysql.async_mysql_data_source import AsyncMysqlDataSource
+                self.async_data_source_dict[data_source_name] = AsyncMysqlDataSource(name=data_source_name, conf=data_source_conf)
+
+        elif 'sqlite' == data_source_conf.get('dialect'):
+            from .db.sqlite.sqlite_data_source import SqliteDataSource
+            self.data_source_dict[data_source_name] = SqliteDataSource(name=data_source_name, conf=data_source_conf)
+        else:
+            raise ValueError(f'不支持的数据源类型: {data_source_conf.get("dialect")}')
+
+        # all structures of the default database up front, instead of one metadata query per table on first use
+        if configurator.get_conf_default('seal', 'schema', 'preload', default=False):
+            structures.preload(self.data_source_dict[data_source_name])
+        return time.perf_counter() - start_time
+
     def data_source(self, data_source_name):
         if not self._initialized:
             raise ValueError('uninitialized seal')
         return self.data_source_dict.get(data_source_name)
 
+    def async_data_source(self, data_source_name):
+        if not self._initialized:
+            raise ValueError('uninitialized seal')
+        return self.async_data_source_dict.get(data_source_name)
+
     def get_config(self, *keys):
         if not self._initialized:
             raise ValueError('uninitialized seal')
@@ -128,6 +181,62 @@ class Seal:
                              logical_deleted_value_true=self.get_config_default('seal', 'orm', 'logical_deleted_value_true'),
                              logical_deleted_value_false=self.get_config_default('seal', 'orm', 'logical_deleted_value_false'), )
 
+    def async_query_wrapper(self, table: str, database: str | None = None, data_source: str = 'default', disable_logical_deleted=False) -> AsyncQueryWrapper:
+        if data_source not in self.async_data_source_dict:
+            raise ValueError(f'unknown async data source: {data_source}')
+        if database is None:
+            database = self.async_data_source_dict[data_source].get_default_database()
+
+        logical_deleted_field = self.get_config_default('seal', 'orm', 'logical_deleted_field')
+        if disable_logical_deleted:
+            logical_deleted_field = None
+        return AsyncQueryWrapper(table=table,
+                                 database=database,
+                                 data_source=self.async_data_source_dict[data_source],
+                                 tenant_field=self.get_config_default('seal', 'orm', 'tenant_field'),
+                                 tenant_value=self.get_config_default('seal', 'orm', 'tenant_value'),
+                                 logical_deleted_field=logical_deleted_field,
+                                 logical_deleted_value_true=self.get_config_default('seal', 'orm', 'logical_deleted_value_true'),
+                                 logical_deleted_value_false=self.get_config_default('seal', 'orm', 'logical_deleted_value_false'), )
+
+    def async_update_wrapper(self, table: str, database: str | None = None, data_source: str = 'default', disable_logical_deleted=False) -> AsyncUpdateWrapper:
+        if data_source not in self.async_data_source_dict:
+            raise ValueError(f'unknown async data source: {data_source}')
+        if database is None:
+            database = self.async_data_source_dict[data_source].get_default_database()
+
+        logical_deleted_field = self.get_config_default('seal', 'orm', 'logical_deleted_field')
+        if disable_logical_deleted:
+            logical_deleted_field = None
+        return AsyncUpdateWrapper(table,
+                                  database=database,
+                                  data_source=self.async_data_source_dict[data_source],
+                                  tenant_field=self.get_config_default('seal', 'orm', 'tenant_field'),
+                                  tenant_value=self.get_config_default('seal', 'orm', 'tenant_value'),
+                                  updated_by_field=self.get_config_default('seal', 'orm', 'updated_by_field'),
+                                  updated_at_field=self.get_config_default('seal', 'orm', 'updated_at_field'),
+                                  logical_deleted_field=logical_deleted_field,
+                                  logical_deleted_value_true=self.get_config_default('seal', 'orm', 'logical_deleted_value_true'),
+                                  logical_deleted_value_false=self.get_config_default('seal', 'orm', 'logical_deleted_value_false'), )
+
+    def async_insert_wrapper(self, table: str, database: str | None = None, data_source: str = 'default', disable_logical_deleted=False) -> AsyncInsertWrapper:
+        if data_source not in self.async_data_source_dict:
+            raise ValueError(f'unknown async data source: {data_source}')
+        if database is None:
+            database = self.async_data_source_dict[data_source].get_default_database()
+
+        logical_deleted_field = self.get_config_default('seal', 'orm', 'logical_deleted_field')
+        if disable_logical_deleted:
+            logical_deleted_field = None
+        return AsyncInsertWrapper(table,
+                                  database=database,
+                                  data_source=self.async_data_source_dict[data_source],
+                                  tenant_field=self.get_config_default('seal', 'orm', 'tenant_field'),
+                                  tenant_value=self.get_config_default('seal', 'orm', 'tenant_value'),
+                                  logical_deleted_field=logical_deleted_field,
+                                  logical_deleted_value_true=self.get_config_default('seal', 'orm', 'logical_deleted_value_true'),
+                                  logical_deleted_value_false=self.get_config_default('seal', 'orm', 'logical_deleted_value_false'), )
+
     # noinspection PyMethodMayBeStatic
     def conditions_wrapper(self) -> Wrapper:
         return Wrapper()
@@ -144,7 +253,9 @@ class Seal:
             raise ValueError(f'unknown data source: {data_source}')
         if sql is None:
             raise ValueError('sql is required')
-        return self.data_source_dict['default'].get_executor().custom_update(sql, args)
+        rows = self.data_source_dict[data_source].get_executor().custom_update(sql, args)
+        query_cache.invalidate_sql(self.data_source_dict[data_source], sql)
+        return rows
 
     # noinspection PyMethodMayBeStatic
     def get_structure(self, name: str = None, data_source: str = 'default', database: str | None = None) -> Any:
@@ -152,11 +263,21 @@ class Seal:
             database = self.data_source_dict[data_source].get_default_database()
         if name is None:
             raise ValueError('name is required')
-        structure = structures.get(data_source, database, name)
-        if structure is None:
-            structure = self.data_source_dict[data_source].load_structure(database, name)
-            structures.register(data_source, database, name, structure)
-        return structure
+        return structures.load(self.data_source_dict[data_source], database, name)
+
+    # noinspection PyMethodMayBeStatic
+    def refresh_structure(self, name: str = None, data_source: str = 'default', database: str | None = None) -> Any:
+        """
+        reload structures after a schema change, one table or, without a name, the whole database
+        """
+        return structures.refresh(self.data_source_dict[data_source], database, name)
+
+    # noinspection PyMethodMayBeStatic
+    async def offload(self, func, *args, **kwargs) -> Any:
+        """
+        await a blocking call, e.g. a QueryWrapper terminal method, on the offload thread pool
+        """
+        return await run_sync(func, *args, **kwargs)
 
     def lru_cache(self) -> LRUCache:
         return self._lru_cache
@@ -164,6 +285,18 @@ class Seal:
     def memory_cache(self) -> Cache:
         return self._cache
 
+    # noinspection PyMethodMayBeStatic
+    def query_cache(self) -> QueryCache:
+        return query_cache
+
+    # noinspection PyMethodMayBeStatic
+    def token_cache(self) -> TokenCache:
+        return token_cache
+
+    # noinspection PyMethodMayBeStatic
+    def tracer(self) -> SqlTracer:
+        return tracer
+
     # noinspection PyMethodMayBeStatic
     def generate_token(self, **payloads):
         try:
@@ -178,7 +311,10 @@ class Seal:
 
     # noinspection PyMethodMayBeStatic
     def begin_tx(self, data_source: str = 'default'):
-        sql_context.get().begin(self.data_source_dict[data_source])
+        # the context var default is shared by every request, a transaction gets its own context
+        ctx = SqlContext()
+        sql_context.set(ctx)
+        ctx.begin(self.data_source_dict[data_source])
 
     # noinspection PyMethodMayBeStatic
     def commit_tx(self):
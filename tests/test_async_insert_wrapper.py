@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+
+from seal.db import AsyncInsertWrapper
+from seal.exception import UnsupportedException
+
+
+class StubDataSource:
+    def get_name(self):
+        return 'stub'
+
+    def get_default_database(self):
+        return 'db'
+
+    def get_executor(self):
+        raise AssertionError('load must not reach the executor')
+
+
+def test_load_is_unsupported():
+    wrapper = AsyncInsertWrapper('t', 'db', StubDataSource())
+    with pytest.raises(UnsupportedException, match='not supported for async data sources'):
+        asyncio.run(wrapper.load([{'name': 'a'}]))
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta, timezone
+
+from starlette.responses import JSONResponse
+
+from seal.model import Response as ResponseModel
+from seal.router.fast_response import FastJSONResponse
+
+
+def response_model_body(data):
+    # what a route with response_model=ResponseModel sends: pydantic json mode, rendered by JSONResponse
+    return JSONResponse(ResponseModel.build(data).success().model_dump(mode='json')).body
+
+
+def test_aware_utc_datetime_matches_response_model():
+    data = {'created_at': datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc)}
+    body = FastJSONResponse.envelope(data).body
+    assert b'"2024-01-02T03:04:05.123456Z"' in body
+    assert body == response_model_body(data)
+
+
+def test_naive_and_offset_datetimes_match_response_model():
+    data = [datetime(2024, 1, 2, 3, 4, 5), datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=8)))]
+    assert FastJSONResponse.envelope(data).body == response_model_body(data)
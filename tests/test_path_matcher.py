@@ -0,0 +1,30 @@
+import re
+
+from seal.router.path_matcher import compile_patterns
+
+
+def matches(patterns, path):
+    return compile_patterns(patterns).fullmatch(path) is not None
+
+
+def test_plain_path_keeps_prefix_meaning():
+    # the configuration style from before ant patterns: a bare path excludes everything below it
+    assert matches(['/static'], '/static')
+    assert matches(['/static'], '/static/x')
+    assert matches(['/static/'], '/static/x/y.css')
+    assert not matches(['/static'], '/staticfoo')
+    assert not matches(['/static'], '/api/static')
+
+
+def test_ant_wildcards():
+    assert matches(['/test/**'], '/test')
+    assert matches(['/test/**'], '/test/a/b')
+    assert matches(['/test/*'], '/test/a')
+    assert not matches(['/test/*'], '/test/a/b')
+    assert matches(['/file?.txt'], '/file1.txt')
+    assert not matches(['/file?.txt'], '/file12.txt')
+
+
+def test_no_patterns():
+    assert compile_patterns([]) is None
+    assert isinstance(compile_patterns(['/a']), re.Pattern)